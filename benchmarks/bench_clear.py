@@ -0,0 +1,55 @@
+"""
+Compare clear() against the 2.0.0 byte-by-byte loop, and time fill(),
+the page-range variants and clear_region()
+
+Usage: python benchmarks/bench_clear.py
+"""
+
+"""
+IMPORTS
+"""
+from support import make_display, time_it, count_calls
+
+"""
+FUNCTIONS
+"""
+def legacy_clear(display):
+    # clear() as shipped in 2.0.0
+    for i in range(len(display.buffer)): display.buffer[i] = 0x00
+    display._mark_dirty(0, 0, display.width - 1, display.height - 1)
+    return display
+
+
+def legacy_clear_region(display, x, y, width, height):
+    # Clearing an area pixel by pixel, as the 2.0.0 rect() did
+    for i in range(y, y + height):
+        for j in range(x, x + width):
+            display.plot(j, i, 0)
+    return display
+
+
+"""
+RUNTIME START
+"""
+if __name__ == '__main__':
+    for height in (32, 64):
+        display = make_display(128, height)
+        display.fill(0x5A)
+        legacy_clear(display)
+        old = bytes(display.buffer)
+        display.fill(0x5A).clear()
+        print("128x%i: clear() %s the 2.0.0 loop" % (height, "matches" if bytes(display.buffer) == old else "DIFFERS FROM"))
+        print("%-32s %10s %12s" % ("case", "calls", "us"))
+        for label, func in (("2.0.0 clear loop", lambda: legacy_clear(display)),
+                            ("clear()", lambda: display.clear()),
+                            ("fill()", lambda: display.fill()),
+                            ("fill(0x55)", lambda: display.fill(0x55)),
+                            ("fill(b'\\xAA\\x55')", lambda: display.fill(b"\xAA\x55")),
+                            ("clear_pages(1, 2)", lambda: display.clear_pages(1, 2)),
+                            ("2.0.0 per-pixel 40x20 region", lambda: legacy_clear_region(display, 29, 5, 40, 20)),
+                            ("rect 40x20 colour 0 filled", lambda: display.rect(29, 5, 40, 20, 0, True)),
+                            ("clear_region 40x20", lambda: display.clear_region(29, 5, 40, 20)),
+                            ("clear_region 40x16 page-aligned", lambda: display.clear_region(29, 8, 40, 16))):
+            func()
+            print("%-32s %10i %12.1f" % (label, count_calls(func), time_it(func, 200)))
+        print()
@@ -0,0 +1,89 @@
+"""
+Measure FrameCodec's compression ratio and decode time on typical UI frames
+
+Usage: python benchmarks/bench_codec.py
+"""
+
+"""
+IMPORTS
+"""
+from random import randint, seed
+from support import make_display, time_it
+from ssd1306 import FrameCodec
+
+"""
+FUNCTIONS
+"""
+def dashboard_frames(display, count=20):
+    # Status text with changing figures, as in test_128x32.py
+    frames = []
+    for i in range(count):
+        display.clear().move(0, 0).text_2x("CPU: %i%%" % (40 + i % 7))
+        display.move(0, 16).text("MEM: %i%%" % (15 + i % 3)).move(63, 16).text("DISK: 88%")
+        display.move(0, 24).text("NET: 1Gbps").move(63, 24).text("WAN: %iGbps" % (i % 4))
+        frames.append(bytes(display.buffer))
+    return frames
+
+
+def eyes_frames(display, count=20):
+    # Eyes looking around, as in eyes_128x64.py
+    frames = []
+    for i in range(count):
+        dx = (i % 5) * 3 - 6
+        display.clear()
+        display.circle(35, 16, 16, 1, True).circle(93, 16, 16, 1, True)
+        display.circle(35 + dx, 16, 6, 0, True).circle(93 + dx, 16, 6, 0, True)
+        for j in range(14):
+            display.rect(29 + j * 5, 44, 4, 4, 1, True).rect(29 + j * 5, 49, 4, 4, 1, True)
+        frames.append(bytes(display.buffer))
+    return frames
+
+
+def chart_frames(display, count=20):
+    # A scrolling line chart
+    frames = []
+    values = [randint(4, display.height - 4) for _ in range(40)]
+    for i in range(count):
+        display.clear().line(2, display.height - 3, 2, 0).line(2, display.height - 3, 127, display.height - 3)
+        for j in range(12):
+            display.line(3 + j * 10, values[i + j], 13 + j * 10, values[i + j + 1])
+        frames.append(bytes(display.buffer))
+    return frames
+
+
+def noise_frames(display, count=5):
+    # Worst case: random pixels
+    return [bytes(randint(0, 255) for _ in range(len(display.buffer))) for _ in range(count)]
+
+
+def report(label, display, frames):
+    raw = len(frames[0])
+    encoded = FrameCodec.encode_all(frames)
+    key = encoded[0]
+    deltas = encoded[1:]
+    delta_size = sum(len(e) for e in deltas) / len(deltas)
+    buffer = bytearray(raw)
+    key_time = time_it(lambda: FrameCodec.decode(key, buffer), 50)
+
+    def play():
+        for e in deltas: FrameCodec.decode(e, buffer)
+    delta_time = time_it(play, 10) / len(deltas)
+    copy_time = time_it(lambda: buffer.__setitem__(slice(0, raw), frames[1]), 500)
+    print("%-16s %6i %8i %7.1f%% %8.1f %7.1f%% %10.1f %10.1f %8.1f" % (
+        label, raw, len(key), len(key) * 100 / raw, delta_size, delta_size * 100 / raw,
+        key_time, delta_time, copy_time))
+
+
+"""
+RUNTIME START
+"""
+if __name__ == '__main__':
+    seed(1306)
+    print("%-16s %6s %8s %8s %8s %8s %10s %10s %8s" % (
+        "frames", "raw", "key", "ratio", "delta", "ratio", "key us", "delta us", "copy us"))
+    for height in (32, 64):
+        display = make_display(128, height)
+        report("dashboard x%i" % height, display, dashboard_frames(display))
+        report("eyes x%i" % height, display, eyes_frames(display))
+        report("chart x%i" % height, display, chart_frames(display))
+        report("noise x%i" % height, display, noise_frames(display))
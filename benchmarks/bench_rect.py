@@ -0,0 +1,67 @@
+"""
+Compare rect() against the 2.0.0 per-pixel implementation: call counts,
+wall time and pixel-for-pixel output
+
+Usage: python benchmarks/bench_rect.py
+"""
+
+"""
+IMPORTS
+"""
+from random import randint, seed
+from support import make_display, time_it, count_calls
+
+"""
+FUNCTIONS
+"""
+def legacy_rect(display, x, y, width, height, colour=1, fill=False):
+    # rect() as shipped in 2.0.0
+    x = max(x, 0)
+    y = max(y, 0)
+    if x + width > display.width: width = display.width - x
+    if y + height > display.height: height = display.height - y
+    if colour not in (0, 1): colour = 1
+    for i in range(y, y + height):
+        for j in range(x, x + width):
+            display.plot(j, i, colour)
+            if fill is False and x < j < x + width - 1 and y < i < y + height - 1:
+                display.plot(j, i, 0)
+    return display
+
+
+def check_identical(height, runs=2000):
+    old = make_display(128, height)
+    new = make_display(128, height)
+    seed(height)
+    for _ in range(runs):
+        args = (randint(-8, 130), randint(-8, height + 2), randint(-2, 130), randint(-2, height + 2),
+                randint(0, 1), randint(0, 1) == 1)
+        if randint(0, 3) == 0:
+            old.clear()
+            new.clear()
+        legacy_rect(old, *args)
+        new.rect(*args)
+        if bytes(old.buffer) != bytes(new.buffer):
+            return "MISMATCH for rect%s" % (args,)
+    return "identical over %i random rects" % runs
+
+
+"""
+RUNTIME START
+"""
+if __name__ == '__main__':
+    for height in (32, 64):
+        display = make_display(128, height)
+        print("128x%i: %s" % (height, check_identical(height)))
+        print("%-28s %10s %10s %12s %12s" % ("case", "old calls", "new calls", "old us", "new us"))
+        for label, args in (("outline, full screen", (0, 0, 128, height, 1, False)),
+                            ("filled, full screen", (0, 0, 128, height, 1, True)),
+                            ("filled, 20x13 unaligned", (5, 3, 20, 13, 1, True)),
+                            ("outline, 80x20 clear", (29, 3, 80, 20, 0, False)),
+                            ("filled, 4x4", (29, 9, 4, 4, 1, True))):
+            old_calls = count_calls(lambda: legacy_rect(display, *args))
+            new_calls = count_calls(lambda: display.rect(*args))
+            old_time = time_it(lambda: legacy_rect(display, *args), 20)
+            new_time = time_it(lambda: display.rect(*args), 200)
+            print("%-28s %10i %10i %12.1f %12.1f" % (label, old_calls, new_calls, old_time, new_time))
+        print()
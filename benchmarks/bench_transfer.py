@@ -0,0 +1,48 @@
+"""
+Compare draw() across max_transfer chunk sizes on an emulated 400kHz bus that
+charges a fixed overhead per transaction: transactions, bytes, modelled bus
+time and the driver's own time
+
+Usage: python benchmarks/bench_transfer.py
+"""
+
+"""
+IMPORTS
+"""
+from support import make_emulated_display, time_it, LimitedBus, MockI2C
+
+"""
+FUNCTIONS
+"""
+def full_frame(display):
+    display.draw(True)
+
+
+def partial_frame(display):
+    # A 60x20 box, as a gauge or status area would change
+    display.rect(30, 8, 60, 20, 1, True)
+    display.draw()
+
+
+"""
+RUNTIME START
+"""
+if __name__ == '__main__':
+    # 400kHz I2C is 22.5us per byte; the per-transaction overhead varies most
+    # between bus stacks, from ~10us on a microcontroller to ~100us via i2c-dev
+    for overhead in (10, 100):
+        print("Per-transaction overhead %ius, 400kHz" % overhead)
+        print("%-14s %-10s %8s %8s %10s %10s" % ("case", "max bytes", "writes", "bytes", "bus us", "driver us"))
+        for label, func in (("full 128x64", full_frame), ("partial 60x20", partial_frame)):
+            for size in (None, 256, 128, 64, 32, 16):
+                display, bus, panel = make_emulated_display(128, 64, LimitedBus(400000, overhead, size), size)
+                func(display)
+                bus.reset_stats()
+                func(display)
+                traffic = bus.stats()
+                # Time the driver alone, not the emulated controller
+                display.i2c = MockI2C()
+                print("%-14s %-10s %8i %8i %10.0f %10.1f" % (label, size or "no limit", traffic["transactions"],
+                                                             traffic["bytes"], traffic["bus_us"],
+                                                             time_it(lambda: func(display), 200)))
+        print()
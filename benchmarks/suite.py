@@ -0,0 +1,300 @@
+"""
+Time the drawing primitives, draw() and replays of the example programs at
+128x32 and 128x64. Each case reports operations per second, the Python-level
+calls one operation makes, and the bytes, transactions and bus time one
+operation puts on an EmulatedBus at 400kHz. Timings and call counts are taken
+on a mock bus, so that they measure the driver, not the emulated controller.
+
+Results are written as JSON. Pass --baseline to compare them with an earlier
+run: a case regresses if it makes more calls, sends more bytes or transactions
+or, when the baseline has timings saved on the same host and Python, is slower
+by more than --tolerance. Call and bus counts are exact and portable; timings
+are not, so save a baseline on each machine with --save. benchmarks/baseline.json
+holds the counts for the current release, saved with --counts-only: it checks
+counts, never timings.
+
+Usage:
+    python benchmarks/suite.py -o results.json
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --baseline baseline.json
+    python benchmarks/suite.py --save baseline.json --counts-only
+"""
+
+"""
+IMPORTS
+"""
+import argparse
+import json
+import platform
+import sys
+from random import randint, seed
+from support import make_display, make_emulated_display, count_calls, ops_per_second, MockI2C
+
+"""
+CONSTANTS
+"""
+SIZES = ((128, 32), (128, 64))
+
+# Eye and mouth geometry, from examples/*/eyes_128x64.py
+CENTRE_SEP = 12
+PUPIL_SIZES = [2, 6, 10]
+PUPIL_POSNS = [47, 16, 81, 16, 40, 16, 74, 16, 54, 16, 88, 16, 47, 9, 81, 9, 47, 24, 81, 24,
+               43, 12, 77, 12, 51, 12, 85, 12, 51, 20, 85, 20, 43, 20, 77, 20, 51, 20, 77, 20]
+
+"""
+CLASSES
+"""
+class EyesWorkload:
+    """
+    One pass of the main loop of examples/*/eyes_128x64.py per step(), with a
+    fixed random seed and the mood changing every 20 frames
+    """
+    def __init__(self, display):
+        self.display = display
+        self.frame = 0
+        self.eyes_closed = False
+        self.pupil_direction = 0
+        self.blink_count = 0
+        seed(64)
+        self.mouth(False)
+
+    def mouth(self, is_wide):
+        display = self.display
+        x = 29
+        y = 44
+        gap = 16 if is_wide else 5
+        display.rect(x, y, 80, 20, 0)
+        for _ in range(14):
+            display.rect(x, y, 4, 4, 1, True)
+            display.rect(x, y + gap, 4, 4, 1, True)
+            x += 5
+        if is_wide:
+            display.rect(34, 44, 4, 13, 1, True)
+            display.rect(89, 44, 4, 13, 1, True)
+
+    def step(self):
+        display = self.display
+        mood = (self.frame // 20) % 3
+        self.frame += 1
+        self.blink_count += 1
+        close_next = False
+        if self.eyes_closed:
+            display.circle(47 - CENTRE_SEP, 16, 14, 0, True).circle(81 + CENTRE_SEP, 16, 14, 0, True)
+            self.blink_count = 0
+        else:
+            r = randint(0, 100)
+            if self.pupil_direction > 0:
+                if r > 20: self.pupil_direction = 0
+            else:
+                if r > 60: self.pupil_direction = randint(0, 8)
+                if r == 3: self.pupil_direction = 9
+            display.circle(47 - CENTRE_SEP, 16, 16, 1, True).circle(81 + CENTRE_SEP, 16, 16, 1, True)
+            a = self.pupil_direction << 2
+            display.circle(PUPIL_POSNS[a] - CENTRE_SEP, PUPIL_POSNS[a + 1], PUPIL_SIZES[1], 0, True)
+            display.circle(PUPIL_POSNS[a + 2] + CENTRE_SEP, PUPIL_POSNS[a + 3], PUPIL_SIZES[1], 0, True)
+        if self.blink_count > 5 and randint(0, 10) > 6: close_next = True
+        if mood == 1:
+            display.line(38 - CENTRE_SEP, -10, 64 - CENTRE_SEP, 0, 10, 0).line(66 + CENTRE_SEP, 0, 92 + CENTRE_SEP, -10, 10, 0)
+            if self.eyes_closed:
+                display.line(42 - CENTRE_SEP, 1, 60 - CENTRE_SEP, 9, 2, 1).line(68 + CENTRE_SEP, 9, 86 + CENTRE_SEP, 1, 2, 1)
+        elif mood == 2:
+            display.line(32 - CENTRE_SEP, 0, 56 - CENTRE_SEP, -10, 10, 0).line(72 + CENTRE_SEP, -10, 96 + CENTRE_SEP, 0, 10, 0)
+            if self.eyes_closed:
+                display.line(34 - CENTRE_SEP, 9, 53 - CENTRE_SEP, 1, 2, 1).line(75 + CENTRE_SEP, 1, 94 + CENTRE_SEP, 9, 2, 1)
+        self.mouth(mood == 1)
+        self.eyes_closed = close_next if not self.eyes_closed else False
+        display.draw()
+
+
+"""
+FUNCTIONS
+"""
+def test_128x32_pass(display):
+    # One pass of the main loop of examples/*/test_128x32.py, without the pauses
+    width = display.width
+    height = display.height
+    seed(32)
+    display.clear().home().text_2x("CPU: 45%")
+    display.move(0, 16).text("MEM: 15%").move(63, 16).text("DISK: 88%")
+    display.move(0, 24).text("NET: 1Gbps").move(63, 24).text("WAN: 3Gbps").draw()
+    display.clear().draw()
+    for i in range(0, 31, 4):
+        display.line(0, 0, 120 - i * 4, height - 1)
+    display.draw()
+    display.clear().draw()
+    for i in range(0, 31, 4):
+        display.line(i * 4, height - 1, 120, 0)
+    display.draw()
+    display.clear().draw()
+    fill = True
+    for _ in range(11):
+        display.circle(randint(0, width), randint(0, height), randint(4, height // 2 - 1), 1, fill).draw()
+        fill = not fill
+    display.clear().draw()
+    fill = True
+    for _ in range(11):
+        display.rect(randint(0, width), randint(0, height), randint(0, height), randint(0, height // 2), 1, fill).draw()
+        fill = not fill
+    display.clear().draw()
+    for i in range(0, height, 4):
+        display.plot(0, i).plot(1, i)
+    for i in range(3, width, 4):
+        display.plot(i, height - 1).plot(i, height - 2)
+    display.line(2, height - 3, 2, 0).line(2, height - 3, width, height - 3).draw()
+    x = 3
+    y = height - 4
+    state = True
+    for i in range(10):
+        k = 4 if state else 1
+        display.line(x, y, x + 10, y - i * k).draw()
+        state = not state
+        x += 10
+        y = y - i * k
+    pixel_length = display.length_of_string("Growth")
+    display.move(127 - pixel_length, int(height * 0.75) - 8).text("Growth").draw()
+
+
+def cases(display):
+    # The operations to time on a display, as (name, function) pairs
+    w = display.width
+    h = display.height
+    d = display
+    colour = [0]
+
+    def draw_partial():
+        # Flip one pixel, so every draw() has something to send
+        colour[0] ^= 1
+        d.plot(64, 3, colour[0]).draw()
+
+    result = [
+        ("plot", lambda: d.plot(17, 9)),
+        ("line horizontal", lambda: d.line(0, 5, w - 1, 5)),
+        ("line vertical", lambda: d.line(9, 0, 9, h - 1)),
+        ("line shallow", lambda: d.line(0, 0, w - 1, h // 4)),
+        ("line diagonal", lambda: d.line(0, 0, h - 1, h - 1)),
+        ("line steep", lambda: d.line(3, 0, 11, h - 1)),
+        ("line clipped", lambda: d.line(-40, -20, w + 40, h + 20)),
+        ("line thick 3", lambda: d.line(0, 0, w - 1, h - 1, 3)),
+        ("line thick 8", lambda: d.line(0, h // 2, w - 1, h // 3, 8)),
+    ]
+    for radius in (2, 8, 16, 32, 64):
+        result.append(("circle r%i outline" % radius, lambda r=radius: d.circle(w // 2, h // 2, r, 1, False)))
+        result.append(("circle r%i filled" % radius, lambda r=radius: d.circle(w // 2, h // 2, r, 1, True)))
+    result += [
+        ("rect outline full", lambda: d.rect(0, 0, w, h)),
+        ("rect filled full", lambda: d.rect(0, 0, w, h, 1, True)),
+        ("rect filled 20x13", lambda: d.rect(5, 3, 20, 13, 1, True)),
+        ("text", lambda: d.move(0, 0).text("Hello, World!")),
+        ("text wrapped", lambda: d.move(0, 0).text("The quick brown fox jumps over the lazy dog", True)),
+        ("text_2x", lambda: d.move(0, 0).text_2x("CPU: 45%")),
+        ("length_of_string", lambda: d.length_of_string("The quick brown fox")),
+        ("clear", lambda: d.clear()),
+        ("draw full", lambda: d.draw(True)),
+        ("draw partial", draw_partial),
+    ]
+    if h == 64:
+        eyes = EyesWorkload(d)
+        result.append(("replay eyes_128x64 frame", eyes.step))
+    else:
+        result.append(("replay test_128x32 pass", lambda: test_128x32_pass(d)))
+    return result
+
+
+def measure(width, height, min_time):
+    # Run every case on a fresh display of the given size
+    results = {}
+    display = make_display(width, height)
+    names = [name for name, op in cases(display)]
+    for name in names:
+        # A fresh display and workload per case, so cases don't affect each other
+        display, bus, panel = make_emulated_display(width, height)
+        op = dict(cases(display))[name]
+        # Warm up caches, then measure one operation's bus traffic
+        op()
+        bus.reset_stats()
+        op()
+        traffic = bus.stats()
+        # Count and time the driver alone, not the emulated controller
+        display.i2c = MockI2C()
+        results[name] = {"bytes": traffic["bytes"],
+                         "transactions": traffic["transactions"],
+                         "bus_us": round(traffic["bus_us"], 1),
+                         "calls": count_calls(op),
+                         "ops_per_sec": round(ops_per_second(op, min_time), 1)}
+    return results
+
+
+def is_timed(results, baseline):
+    # Timings only compare on the host and Python that saved them
+    return "host" in baseline and results["host"] == baseline["host"] and results["python"] == baseline.get("python")
+
+
+def counts_only(results):
+    # Drop the timings, and the host they were taken on, for a portable baseline
+    baseline = {"python": results["python"], "results": {}}
+    for size, size_results in results["results"].items():
+        baseline["results"][size] = {}
+        for name, case in size_results.items():
+            baseline["results"][size][name] = dict((key, value) for key, value in case.items() if key != "ops_per_sec")
+    return baseline
+
+
+def compare(results, baseline, tolerance):
+    # List the cases that are slower, busier or chattier than the baseline
+    regressions = []
+    same_machine = is_timed(results, baseline)
+    for size, size_results in results["results"].items():
+        for name, now in size_results.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None: continue
+            if same_machine and now["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+                regressions.append("%s %s: %.0f ops/s, was %.0f" % (size, name, now["ops_per_sec"], before["ops_per_sec"]))
+            for key in ("calls", "bytes", "transactions"):
+                if now[key] > before[key]:
+                    regressions.append("%s %s: %i %s, was %i" % (size, name, now[key], key, before[key]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SSD1306 driver on a mock bus")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file. Default: stdout")
+    parser.add_argument("-b", "--baseline", help="compare the results with this earlier JSON file")
+    parser.add_argument("-s", "--save", help="save the results as a baseline JSON file")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.2, help="the slowdown allowed before a case regresses. Default: 0.2")
+    parser.add_argument("-c", "--counts-only", action="store_true", help="save the baseline without timings, to check counts on any host")
+    parser.add_argument("-q", "--quick", action="store_true", help="time each case briefly, for smoke tests")
+    args = parser.parse_args(argv)
+
+    min_time = 0.02 if args.quick else 0.2
+    results = {"python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+               "host": platform.node(),
+               "results": {}}
+    for width, height in SIZES:
+        results["results"]["%ix%i" % (width, height)] = measure(width, height, min_time)
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    if args.save:
+        with open(args.save, "w") as file:
+            file.write(json.dumps(counts_only(results) if args.counts_only else results, indent=2, sort_keys=True) + "\n")
+    if not (args.output or args.save): print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        if regressions: return 1
+        timed = is_timed(results, baseline)
+        print("No regressions against %s%s" % (args.baseline, "" if timed else ", counts only"), file=sys.stderr)
+    return 0
+
+
+"""
+RUNTIME START
+"""
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Shared helpers for the benchmark scripts. These run on CPython with no hardware:
+the display is given a mock I2C bus and reset pin, or, to model the time spent
+on the bus, the emulated controller and bus from ssd1306_emulator.py
+"""
+
+"""
+IMPORTS
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ssd1306 import SSD1306OLED
+from ssd1306_emulator import EmulatedBus, EmulatedSSD1306
+
+"""
+CLASSES
+"""
+class MockPin:
+    """
+    A stand-in for a CircuitPython DigitalInOut reset pin
+    """
+    def __init__(self):
+        self.value = True
+
+
+class MockI2C:
+    """
+    A stand-in I2C bus that records the size of every transaction
+    """
+    def __init__(self):
+        self.transactions = 0
+        self.bytes_sent = 0
+
+    def writeto(self, address, buffer):
+        self.transactions += 1
+        self.bytes_sent += len(buffer)
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes_sent = 0
+
+
+"""
+FUNCTIONS
+"""
+def make_display(width=128, height=32):
+    """
+    Create a display attached to a mock bus, with the bus counters zeroed
+    """
+    i2c = MockI2C()
+    display = SSD1306OLED(MockPin(), i2c, 0x3C, width, height)
+    i2c.reset()
+    return display
+
+
+def make_emulated_display(width=128, height=32, bus=None, max_transfer=None):
+    """
+    Create a display attached to an emulated controller, on an EmulatedBus
+    at 400kHz unless another bus is given, with the bus counters zeroed
+
+    Returns:
+        The display, the bus and the emulated controller
+    """
+    if bus is None: bus = EmulatedBus(400000)
+    panel = bus.add(EmulatedSSD1306(width, height), 0x3C)
+    display = SSD1306OLED(panel.reset_pin, bus, 0x3C, width, height, max_transfer)
+    bus.reset_stats()
+    return display, bus, panel
+
+
+def time_it(func, repeat=100):
+    """
+    Return the mean wall time of func() in microseconds
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000000 / repeat
+
+
+def count_calls(func):
+    """
+    Return the number of Python-level function calls made by func()
+    """
+    calls = [0]
+    def profiler(frame, event, arg):
+        if event == "call": calls[0] += 1
+    sys.setprofile(profiler)
+    try:
+        func()
+    finally:
+        sys.setprofile(None)
+    return calls[0] - 1
+
+
+class LimitedBus(EmulatedBus):
+    """
+    An emulated bus that, like SMBus, refuses writes longer than a set size
+    """
+    def __init__(self, frequency=400000, overhead_us=0, max_length=None):
+        super().__init__(frequency, overhead_us)
+        self.max_length = max_length
+
+    def writeto(self, address, buffer):
+        if self.max_length is not None and len(buffer) > self.max_length:
+            raise OSError("write of %i bytes exceeds the bus limit" % len(buffer))
+        super().writeto(address, buffer)
+
+
+def ops_per_second(func, min_time=0.2, rounds=5):
+    """
+    Return how many times per second func() runs: the best of several timed
+    batches, as timeit does, since slower runs only measure interference
+    """
+    # Size a batch to take about min_time / rounds
+    batch = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / rounds: break
+        batch *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return batch / best
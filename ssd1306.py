@@ -37,15 +37,65 @@ class SSD1306OLED:
     #SSD1306_EXTERNALVCC = 0x01
     #SSD1306_SWITCHCAPVCC = 0x02
     #SSD1306_SETHIGHCOLUMN = 0x10
-    #SSD1306_RIGHT_HORIZONTAL_SCROLL = 0x26
-    #SSD1306_LEFT_HORIZONTAL_SCROLL = 0x27
-    #SSD1306_VERTICAL_AND_RIGHT_HORIZONTAL_SCROLL = 0x29
-    #SSD1306_VERTICAL_AND_LEFT_HORIZONTAL_SCROLL = 0x2A
-    #SSD1306_DEACTIVATE_SCROLL = 0x2E
-    #SSD1306_ACTIVATE_SCROLL = 0x2F
-    #SSD1306_SET_VERTICAL_SCROLL_AREA = 0xA3
+    SSD1306_RIGHT_HORIZONTAL_SCROLL = 0x26
+    SSD1306_LEFT_HORIZONTAL_SCROLL = 0x27
+    SSD1306_VERTICAL_AND_RIGHT_HORIZONTAL_SCROLL = 0x29
+    SSD1306_VERTICAL_AND_LEFT_HORIZONTAL_SCROLL = 0x2A
+    SSD1306_DEACTIVATE_SCROLL = 0x2E
+    SSD1306_ACTIVATE_SCROLL = 0x2F
+    SSD1306_SET_VERTICAL_SCROLL_AREA = 0xA3
     #SSD1306_COMSCANINC = 0xC0
 
+    # The power-up command sequence, sent as a single I2C transaction.
+    # The bytes at the INIT_* offsets depend on the panel size and are
+    # set by the constructor
+    INIT_SEQUENCE = bytes([
+        0x00,                                   # Control byte: commands follow
+        SSD1306_DISPLAYOFF,
+        SSD1306_SETDISPLAYCLOCKDIV, 0x80,
+        SSD1306_SETMULTIPLEX, 0x1F,
+        SSD1306_SETDISPLAYOFFSET, 0x00,
+        SSD1306_SETSTARTLINE,
+        SSD1306_CHARGEPUMP, 0x14,
+        SSD1306_MEMORYMODE, 0x00,
+        SSD1306_SEGREMAP,
+        SSD1306_COMSCANDEC,
+        SSD1306_SETCOMPINS, 0x02,
+        SSD1306_SETCONTRAST, 0x8F,
+        SSD1306_SETPRECHARGE, 0xF1,
+        SSD1306_SETVCOMDETECT, 0x40,
+        SSD1306_DISPLAYALLON_RESUME,
+        SSD1306_NORMALDISPLAY,
+        SSD1306_DISPLAYON
+    ])
+    INIT_MULTIPLEX = 5
+    INIT_COMPINS = 16
+
+    # Scroll step intervals, in frames, and their command codes
+    SCROLL_INTERVALS = {5: 0, 64: 1, 128: 2, 256: 3, 3: 4, 4: 5, 25: 6, 2: 7}
+
+    # The public methods set_profiling() instruments, and the private
+    # methods it counts bus traffic in
+    PROFILED = ("plot", "line", "circle", "ellipse", "rect", "round_rect", "text", "text_2x",
+                "text_aligned", "length_of_string", "render_text_to_bitmap", "blit", "capture",
+                "clear", "fill", "fill_pages", "clear_pages", "clear_region", "draw", "show_frame")
+    PROFILED_BUS = ("send_commands", "_set_window", "_write_data")
+    # The profiled methods that change no pixels, so needn't be compared
+    PROFILED_UNCHANGING = ("length_of_string", "render_text_to_bitmap", "capture", "draw")
+
+    # The approximate bus time, in byte-times, an I2C transaction costs
+    # beyond its data: start and stop conditions and the address byte
+    TRANSACTION_COST = 2
+
+    # The character set as a Font, built by _default_font()
+    _font = None
+
+    # Bitmaps made by render_text_to_bitmap(), shared by all instances,
+    # and their total size limit in bytes
+    _text_bitmaps = {}
+    _text_bitmap_tick = 0
+    TEXT_BITMAP_CACHE_SIZE = 2048
+
     CHARSET = [
         b"\x00\x00",                # space - Ascii 32
         b"\xfa",                    # !
@@ -145,34 +195,9 @@ class SSD1306OLED:
         b"\x60\x90\x90\x60"         # Degrees sign - Ascii 127
     ]
 
-    COS_TABLE = [
-        0.000,0.035,0.070,0.105,0.140,0.174,0.208,0.243,0.276,0.310,0.343,0.376,0.408,0.439,0.471,0.501,0.531,0.561,0.589,0.617,0.644,
-        0.671,0.696,0.721,0.745,0.768,0.790,0.810,0.830,0.849,0.867,0.884,0.900,0.915,0.928,0.941,0.952,0.962,0.971,0.979,0.985,0.991,
-        0.995,0.998,1.000,1.000,0.999,0.997,0.994,0.990,0.984,0.977,0.969,0.960,0.949,0.938,0.925,0.911,0.896,0.880,0.863,0.845,0.826,
-        0.806,0.784,0.762,0.739,0.715,0.690,0.664,0.638,0.610,0.582,0.554,0.524,0.494,0.463,0.432,0.400,0.368,0.335,0.302,0.268,0.234,
-        0.200,0.166,0.131,0.096,0.062,0.027,-0.008,-0.043,-0.078,-0.113,-0.148,-0.182,-0.217,-0.251,-0.284,-0.318,-0.351,-0.383,-0.415,
-        -0.447,-0.478,-0.508,-0.538,-0.567,-0.596,-0.624,-0.651,-0.677,-0.702,-0.727,-0.750,-0.773,-0.795,-0.815,-0.835,-0.854,-0.872,
-        -0.888,-0.904,-0.918,-0.931,-0.944,-0.955,-0.964,-0.973,-0.981,-0.987,-0.992,-0.996,-0.998,-1.000,-1.000,-0.999,-0.997,-0.993,
-        -0.988,-0.982,-0.975,-0.967,-0.957,-0.947,-0.935,-0.922,-0.908,-0.893,-0.876,-0.859,-0.840,-0.821,-0.801,-0.779,-0.757,-0.733,
-        -0.709,-0.684,-0.658,-0.631,-0.604,-0.575,-0.547,-0.517,-0.487,-0.456,-0.424,-0.392,-0.360,-0.327,-0.294,-0.260,-0.226,-0.192,
-        -0.158,-0.123,-0.088,-0.053,-0.018]
-
-    SIN_TABLE = [
-        1.000,0.999,0.998,0.994,0.990,0.985,0.978,0.970,0.961,0.951,0.939,0.927,0.913,0.898,0.882,0.865,0.847,0.828,0.808,0.787,
-        0.765,0.742,0.718,0.693,0.667,0.641,0.614,0.586,0.557,0.528,0.498,0.467,0.436,0.404,0.372,0.339,0.306,0.272,0.238,0.204,
-        0.170,0.135,0.101,0.066,0.031,-0.004,-0.039,-0.074,-0.109,-0.144,-0.178,-0.213,-0.247,-0.280,-0.314,-0.347,-0.379,-0.412,
-        -0.443,-0.474,-0.505,-0.535,-0.564,-0.593,-0.620,-0.647,-0.674,-0.699,-0.724,-0.747,-0.770,-0.792,-0.813,-0.833,-0.852,
-        -0.870,-0.886,-0.902,-0.916,-0.930,-0.942,-0.953,-0.963,-0.972,-0.980,-0.986,-0.991,-0.995,-0.998,-1.000,-1.000,-0.999,
-        -0.997,-0.994,-0.989,-0.983,-0.976,-0.968,-0.959,-0.948,-0.936,-0.924,-0.910,-0.895,-0.878,-0.861,-0.843,-0.823,-0.803,
-        -0.782,-0.759,-0.736,-0.712,-0.687,-0.661,-0.635,-0.607,-0.579,-0.550,-0.520,-0.490,-0.459,-0.428,-0.396,-0.364,-0.331,
-        -0.298,-0.264,-0.230,-0.196,-0.162,-0.127,-0.092,-0.057,-0.022,0.013,0.048,0.083,0.117,0.152,0.187,0.221,0.255,0.288,
-        0.322,0.355,0.387,0.419,0.451,0.482,0.512,0.542,0.571,0.599,0.627,0.654,0.680,0.705,0.730,0.753,0.776,0.797,0.818,0.837,
-        0.856,0.874,0.890,0.906,0.920,0.933,0.945,0.956,0.966,0.974,0.981,0.988,0.992,0.996,0.999,1.000]
-
-
     # *********** CONSTRUCTOR **********
 
-    def __init__(self, reset_pin, i2c, address=0x3C, width=128, height=32):
+    def __init__(self, reset_pin, i2c, address=0x3C, width=128, height=32, max_transfer=None, do_reset=True, do_init=True):
         assert 0x00 <= address < 0x80, "ERROR - Invalid I2C address in HT16K33()"
 
         # Just in case it hasn't been imported by the caller
@@ -193,40 +218,72 @@ class SSD1306OLED:
         self.height = height
         self.x = 0
         self.y = 0
-        self.buffer = bytearray(width * int(height / 8))
-
-        # Toggle the RST pin over 1ms + 10ms
-        self._set_rst()
-        time.sleep(0.001)
-        self._set_rst(False)
-        time.sleep(0.01)
-        self._set_rst()
-
-        # Write the display settings
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_DISPLAYOFF]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETDISPLAYCLOCKDIV, 0x80]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETMULTIPLEX, self.height - 1]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETDISPLAYOFFSET, 0x00]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETSTARTLINE]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_CHARGEPUMP, 0x14]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_MEMORYMODE, 0x00]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SEGREMAP]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_COMSCANDEC]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETCOMPINS, 0x02 if self.height in (16, 32) else 0x12]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETCONTRAST, 0x8F]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETPRECHARGE, 0xF1]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_SETVCOMDETECT, 0x40]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_DISPLAYALLON_RESUME]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_NORMALDISPLAY]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_DISPLAYON]))
-
-        pages = (self.height // 8) - 1 # 0x03 if self.height == 64 else 0x07
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_COLUMNADDR, 0x00, self.width - 1]))
-        self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_PAGEADDR, 0x00, pages]))
-
-        # Clear the display
-        self.clear()
-        self.draw()
+
+        # The transmit buffer is the data control byte followed by the
+        # frame, so draw() can send it as-is. self.buffer is a view of
+        # the frame part, not a copy
+        self._tx = bytearray(width * int(height / 8) + 1)
+        self._tx[0] = self.SSD1306_WRITETOBUFFER
+        self._tx_view = memoryview(self._tx)
+        self.buffer = self._tx_view[1:]
+
+        # Preallocated rows of set and clear bytes for filling whole pages
+        self._ones = memoryview(bytes([0xFF]) * width)
+        self._zeros = memoryview(bytes(width))
+
+        # The last fill() pattern other than clear or set, and its row
+        self._fill_pattern = None
+        self._fill_row = None
+
+        # The address window command sent ahead of each draw()
+        self._window = bytearray([0x00, self.SSD1306_COLUMNADDR, 0x00, 0x00, self.SSD1306_PAGEADDR, 0x00, 0x00])
+
+        # Frame diffing, off by default: see set_frame_diff()
+        self._shadow = None
+        self._shadow_view = None
+        self._shadow_stale = False
+
+        # Set while draw_async() is sending
+        self._drawing = False
+
+        # Hardware scrolling state: see scroll_horizontal()
+        self.is_scrolling = False
+        self._scroll_area = (0, height)
+
+        # Profiling, off by default: see set_profiling()
+        self._profile = None
+
+        # Dirty-region tracking: per page, the lowest and highest columns
+        # changed since the last draw(). An empty page has lo > hi
+        self.pages = height >> 3
+        self._dirty_lo = [width] * self.pages
+        self._dirty_hi = [-1] * self.pages
+
+        # The windows the next draw() will send, four bytes each:
+        # first and last column, first and last page. See _plan_render()
+        self._runs = bytearray(((self.pages + 1) >> 1) << 2)
+
+        # The largest write the I2C bus takes in one transaction
+        self.set_max_transfer(max_transfer)
+
+        # With no bus, this is an off-screen buffer, eg. a DisplayGroup's canvas
+        if i2c is None: return
+
+        # Toggle the RST pin over 1ms + 10ms, unless the caller has,
+        # eg. for several displays sharing the pin
+        if do_reset:
+            self._set_rst()
+            time.sleep(0.001)
+            self._set_rst(False)
+            time.sleep(0.01)
+            self._set_rst()
+
+        # Set up and clear the display, unless the caller will,
+        # eg. a DisplayGroup initialising its panels together
+        if do_init:
+            self._send_init()
+            self.clear()
+            self.draw()
 
     # *********** PUBLIC METHODS **********
 
@@ -236,11 +293,115 @@ class SSD1306OLED:
 
         Args:
             is_inverse (bool): should the display be black-on-white (True) or white-on-black (False).
+
+        Returns:
+            The instance (self)
         """
-        if is_inverse:
-            self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_INVERTDISPLAY]))
-        else:
-            self.i2c.writeto(self.address, bytes([0x00, self.SSD1306_NORMALDISPLAY]))
+        return self.send_commands(self.SSD1306_INVERTDISPLAY if is_inverse else self.SSD1306_NORMALDISPLAY)
+
+    def send_commands(self, *commands):
+        """
+        Send one or more commands, and their parameters, to the display
+        in a single I2C transaction, or in as few as set_max_transfer() allows
+
+        Args:
+            commands (int) The command and parameter bytes
+
+        Returns:
+            The instance (self)
+        """
+        chunk = self._chunk
+        if chunk == 0 or len(commands) <= chunk:
+            self.i2c.writeto(self.address, bytes((0x00,) + commands))
+            return self
+        # The display takes a command's parameters from later writes, so split anywhere
+        for start in range(0, len(commands), chunk):
+            self.i2c.writeto(self.address, bytes((0x00,) + commands[start:start + chunk]))
+        return self
+
+    def scroll_horizontal(self, direction="left", start_page=0, end_page=None, interval=5):
+        """
+        Have the display scroll a band of pages horizontally, wrapping
+        round, with no further I2C traffic. The display can't take data
+        while it scrolls: the next draw() stops the scroll
+
+        Args:
+            direction  (string) "left" or "right". Default: "left"
+            start_page (int)    The band's top page, 0 to 7. Default: 0
+            end_page   (int)    The band's bottom page. Default: the last page
+            interval   (int)    The frames between one-column steps: 2, 3, 4, 5, 25, 64, 128 or 256. Default: 5
+
+        Returns:
+            The instance (self)
+        """
+        assert direction in ("left", "right"), "ERROR - Invalid direction passed to scroll_horizontal()"
+        start_page, end_page, code = self._scroll_parameters(start_page, end_page, interval)
+        command = self.SSD1306_LEFT_HORIZONTAL_SCROLL if direction == "left" else self.SSD1306_RIGHT_HORIZONTAL_SCROLL
+        # Stop any scroll before setting up the next
+        self.send_commands(self.SSD1306_DEACTIVATE_SCROLL,
+                           command, 0x00, start_page, code, end_page, 0x00, 0xFF,
+                           self.SSD1306_ACTIVATE_SCROLL)
+        self.is_scrolling = True
+        return self
+
+    def scroll_diagonal(self, direction="left", rows=1, start_page=0, end_page=None, interval=5):
+        """
+        Have the display scroll vertically, and a band of pages horizontally
+        too, with no further I2C traffic. The vertical scroll covers the
+        area set by set_scroll_area(), by default the whole screen. The
+        display can't take data while it scrolls: the next draw() stops the scroll
+
+        Args:
+            direction  (string) The horizontal direction, "left" or "right". Default: "left"
+            rows       (int)    The rows the content moves up each step. Default: 1
+            start_page (int)    The horizontal band's top page, 0 to 7. Default: 0
+            end_page   (int)    The horizontal band's bottom page. Default: the last page
+            interval   (int)    The frames between steps: 2, 3, 4, 5, 25, 64, 128 or 256. Default: 5
+
+        Returns:
+            The instance (self)
+        """
+        assert direction in ("left", "right"), "ERROR - Invalid direction passed to scroll_diagonal()"
+        assert 0 < rows < self._scroll_area[1], "ERROR - Invalid row count passed to scroll_diagonal()"
+        start_page, end_page, code = self._scroll_parameters(start_page, end_page, interval)
+        command = self.SSD1306_VERTICAL_AND_LEFT_HORIZONTAL_SCROLL if direction == "left" else self.SSD1306_VERTICAL_AND_RIGHT_HORIZONTAL_SCROLL
+        top, count = self._scroll_area
+        self.send_commands(self.SSD1306_DEACTIVATE_SCROLL,
+                           self.SSD1306_SET_VERTICAL_SCROLL_AREA, top, count,
+                           command, 0x00, start_page, code, end_page, rows,
+                           self.SSD1306_ACTIVATE_SCROLL)
+        self.is_scrolling = True
+        return self
+
+    def set_scroll_area(self, top=0, rows=None):
+        """
+        Set the band of rows that scroll_diagonal() moves vertically. Rows
+        above it stay fixed. Takes effect from the next scroll_diagonal()
+
+        Args:
+            top  (int) The number of fixed rows at the top of the screen. Default: 0
+            rows (int) The number of rows in the band. Default: the rest of the screen
+
+        Returns:
+            The instance (self)
+        """
+        if rows is None: rows = self.height - top
+        assert 0 <= top and 0 < rows and top + rows <= self.height, "ERROR - Invalid area passed to set_scroll_area()"
+        self._scroll_area = (top, rows)
+        return self
+
+    def stop_scroll(self):
+        """
+        Stop any hardware scroll and show the buffer as it stands. Scrolling
+        moves the display's own copy of the image, so the whole buffer is
+        sent again to put the screen back in step with it
+
+        Returns:
+            The instance (self)
+        """
+        self._end_scroll()
+        self.draw(True)
+        return self
 
     def home(self):
         """
@@ -285,6 +446,9 @@ class SSD1306OLED:
         if colour not in (0, 1): colour = 1
         byte = self._coords_to_index(x, y)
         bit = y - ((y >> 3) << 3)
+        page = y >> 3
+        if x < self._dirty_lo[page]: self._dirty_lo[page] = x
+        if x > self._dirty_hi[page]: self._dirty_hi[page] = x
         if colour == 1:
             # Set the pixel
             self.buffer[byte] |= (1 << bit)
@@ -311,42 +475,69 @@ class SSD1306OLED:
         # Make sure we have a thickness of at least one pixel
         thick = max(thick, 1)
         if colour not in (0, 1): colour = 1
-        # Look for vertical and horizontal lines
-        track_by_x = True
-        if x == tox: track_by_x = False
-        if (toy == y) and (track_by_x is False): return self
-        #assert (y != toy) and (track_by_x is False), "ERROR - Bad co-ordinates passed to line()"
-
-        # Swap start and end values for L-R raster
-        if track_by_x:
-            if x > tox:
-                a = x
-                x = tox
-                tox = a
-            start = x
-            end = tox
-            m = float(toy - y) / float(tox - x)
+
+        # Thickness is added below lines that run mostly horizontally
+        # and to the right of those that run mostly vertically, so clip
+        # the line to the screen extended by that amount
+        band = thick - 1
+        x_major = abs(tox - x) >= abs(toy - y)
+        if x_major:
+            clipped = self._clip_line(x, y, tox, toy, 0, -band, self.width - 1, self.height - 1)
         else:
-            if y > toy:
-                a = y
-                y = toy
-                toy = a
-            start = y
-            end = toy
-            m = float(tox - x) / float(toy - y)
-
-        # Run for 'thick' times to generate thickness
-        for j in range(thick):
-            # Run from x to tox, calculating the y offset at each point
-            for i in range(start, end):
-                if track_by_x:
-                    dy = y + int(m * (i - x)) + j
-                    if (0 <= i < self.width) and (0 <= dy < self.height):
-                        self.plot(i, dy, colour)
+            clipped = self._clip_line(x, y, tox, toy, -band, 0, self.width - 1, self.height - 1)
+        if clipped is None: return self
+        x, y, tox, toy = clipped
+
+        # Horizontal and vertical lines are rectangles
+        if y == toy:
+            self._fill_area(min(x, tox), max(y, 0), max(x, tox), min(y + band, self.height - 1), colour)
+            return self
+        if x == tox:
+            self._fill_area(max(x, 0), min(y, toy), min(x + band, self.width - 1), max(y, toy), colour)
+            return self
+
+        # Integer Bresenham. Every step advances along the major axis
+        dx = abs(tox - x)
+        dy = -abs(toy - y)
+        sx = 1 if tox > x else -1
+        sy = 1 if toy > y else -1
+        err = dx + dy
+        if band == 0:
+            buffer = self.buffer
+            width = self.width
+            self._mark_dirty(min(x, tox), min(y, toy), max(x, tox), max(y, toy))
+            while True:
+                if colour:
+                    buffer[(y >> 3) * width + x] |= (1 << (y & 7))
+                else:
+                    buffer[(y >> 3) * width + x] &= ~(1 << (y & 7))
+                if x == tox and y == toy: break
+                e2 = err << 1
+                if e2 >= dy:
+                    err += dy
+                    x += sx
+                if e2 <= dx:
+                    err += dx
+                    y += sy
+        else:
+            # Thick lines are a span across the minor axis at each step
+            while True:
+                if x_major:
+                    top = max(y, 0)
+                    bottom = min(y + band, self.height - 1)
+                    if top <= bottom: self._fill_area(x, top, x, bottom, colour)
                 else:
-                    dx = x + int(m * (i - y)) + j
-                    if (0 <= i < self.height) and (0 <= dx < self.width):
-                        self.plot(dx, i, colour)
+                    left = max(x, 0)
+                    right = min(x + band, self.width - 1)
+                    if left <= right: self._fill_area(left, y, right, y, colour)
+                if x == tox and y == toy: break
+                e2 = err << 1
+                if e2 >= dy:
+                    err += dy
+                    x += sx
+                if e2 <= dx:
+                    err += dx
+                    y += sy
         return self
 
     def circle(self, x, y, radius, colour=1, fill=False):
@@ -363,22 +554,28 @@ class SSD1306OLED:
         Returns:
             The instance (self)
         """
-        for i in range(180):
-            a = x - int(radius * self.SIN_TABLE[i])
-            b = y - int(radius * self.COS_TABLE[i])
-            # plot() handles off-screen plotting
-            self.plot(a, b, colour)
-            if fill:
-                if a > x:
-                    j = x
-                    while j < a and j < self.width:
-                        self.plot(j, b, colour)
-                        j += 1
-                else:
-                    j = a + 1
-                    while j <= x:
-                        self.plot(j, b, colour)
-                        j += 1
+        if colour not in (0, 1): colour = 1
+        radius = max(radius, 0)
+        self._draw_arcs(x, y, x, y, radius, radius, colour, fill)
+        return self
+
+    def ellipse(self, x, y, x_radius, y_radius, colour=1, fill=False):
+        """
+        Draw an ellipse at the specified co-ordinates
+
+        Args:
+            x        (int)  The centre X co-ordinate in the range 0 - 127
+            y        (int)  The centre Y co-ordinate in the range 0 - 32 or 64, depending on model
+            x_radius (int)  The horizontal radius of the ellipse
+            y_radius (int)  The vertical radius of the ellipse
+            colour   (int)  The colour of the pixel: 1 for set, 0 for clear. Default: 1
+            fill     (bool) Should the ellipse be solid (true) or outline (false). Default: false
+
+        Returns:
+            The instance (self)
+        """
+        if colour not in (0, 1): colour = 1
+        self._draw_arcs(x, y, x, y, max(x_radius, 0), max(y_radius, 0), colour, fill)
         return self
 
     def rect(self, x, y, width, height, colour=1, fill=False):
@@ -401,217 +598,2304 @@ class SSD1306OLED:
         if x + width > self.width: width = self.width - x
         if y + height > self.height: height = self.height - y
         if colour not in (0, 1): colour = 1
-        for i in range(y, y + height):
-            for j in range(x, x + width):
-                self.plot(j, i, colour)
-                if fill is False and x < j < x + width - 1 and y < i < y + height - 1:
-                    self.plot(j, i, 0)
+        if width < 1 or height < 1: return self
+        tox = x + width - 1
+        toy = y + height - 1
+        if fill or width < 3 or height < 3:
+            self._fill_area(x, y, tox, toy, colour)
+        else:
+            # Draw the edges and clear the interior
+            self._fill_area(x, y, tox, y, colour)
+            self._fill_area(x, toy, tox, toy, colour)
+            self._fill_area(x, y + 1, x, toy - 1, colour)
+            self._fill_area(tox, y + 1, tox, toy - 1, colour)
+            self._fill_area(x + 1, y + 1, tox - 1, toy - 1, 0)
+        return self
+
+    def round_rect(self, x, y, width, height, radius, colour=1, fill=False):
+        """
+        Draw a rectangle with rounded corners at the specified co-ordinates
+
+        Args:
+            x      (int)  The start X co-ordinate in the range 0 - 127
+            y      (int)  The start Y co-ordinate in the range 0 - 32 or 64, depending on model
+            width  (int)  The width of the rectangle
+            height (int)  The height of the rectangle
+            radius (int)  The radius of the corners
+            colour (int)  The colour of the pixel: 1 for set, 0 for clear. Default: 1
+            fill   (bool) Should the rectangle be solid (true) or outline (false). Default: false
+
+        Returns:
+            The instance (self)
+        """
+        if width < 1 or height < 1: return self
+        if colour not in (0, 1): colour = 1
+        radius = max(min(radius, (min(width, height) - 1) >> 1), 0)
+        tox = x + width - 1
+        toy = y + height - 1
+        self._draw_arcs(x + radius, y + radius, tox - radius, toy - radius, radius, radius, colour, fill)
         return self
 
-    def text(self, print_string, do_wrap=True):
+    def text(self, print_string, do_wrap=True, font=None):
         """
         Write a line of text at the current cursor co-ordinates
 
         Args:
             print_string (string) The text to print
+            do_wrap      (bool)   Should the text wrap onto the next line. Default: True
+            font         (Font)   The typeface to use. Default: the built-in character set
 
         Returns:
             The display object
         """
         assert len(print_string) > 0, "ERROR - Zero-length string passed to text()"
-        return self._draw_text(print_string, do_wrap, False)
+        return self._draw_text(print_string, do_wrap, False, font)
 
 
-    def text_2x(self, print_string, do_wrap=True):
+    def text_2x(self, print_string, do_wrap=True, font=None):
         """
         Write a line of double-size text at the current cursor co-ordinates
 
         Args:
             print_string (string) The text to print
+            do_wrap      (bool)   Should the text wrap onto the next line. Default: True
+            font         (Font)   An 8-pixel high typeface to use. Default: the built-in character set
 
         Returns:
             The display object
         """
         assert len(print_string) > 0, "ERROR - Zero-length string passed to text_2x()"
-        return self._draw_text(print_string, do_wrap, True)
+        return self._draw_text(print_string, do_wrap, True, font)
+
+    def preload_text_2x(self, characters=None, font=None):
+        """
+        Convert characters to double size ahead of use by text_2x(), which
+        otherwise converts each character the first time it is drawn
+
+        Args:
+            characters (string) The characters to convert. Default: all of them
+            font       (Font)   The typeface to convert. Default: the built-in character set
+
+        Returns:
+            The instance (self)
+        """
+        if font is None: font = self._default_font()
+        font.preload_2x(characters)
+        return self
 
-    def length_of_string(self, print_string):
+    def length_of_string(self, print_string, font=None):
         """
         Calculate the length in pixels of a proportionally spaced string
 
         Args:
             print_string (string) The text to print
+            font         (Font)   The typeface to use. Default: the built-in character set
 
         Returns:
             The string's length in pixels
         """
-        length = 0
-        if len(print_string) > 0:
-            for i in range(0, len(print_string)):
-                asc = ord(print_string[i]) - 32
-                glyph = self.CHARSET[asc]
-                length += (len(glyph) + 1)
-        return length
+        if len(print_string) == 0: return 0
+        if font is None: font = self._default_font()
+        return font.measure(print_string) + 1
 
-    def clear(self):
+    def text_aligned(self, print_string, align="left", do_wrap=True, font=None):
         """
-        Clears the display buffer by creating a new one
+        Write text aligned between the current cursor X co-ordinate and the
+        right-hand edge of the screen, starting at the cursor Y co-ordinate.
+        Lines break at newlines and, if do_wrap is True, between words.
+        Layouts are cached by the font, so redrawing a label is cheap
+
+        Args:
+            print_string (string) The text to print
+            align        (string) "left", "center" or "right". Default: "left"
+            do_wrap      (bool)   Should long lines wrap onto the next line. Default: True
+            font         (Font)   The typeface to use. Default: the built-in character set
 
         Returns:
             The display object
         """
-        for i in range(len(self.buffer)): self.buffer[i] = 0x00
+        assert align in ("left", "center", "right"), "ERROR - Invalid alignment passed to text_aligned()"
+        if font is None: font = self._default_font()
+        left = self.x
+        box = self.width - left
+        y = self.y
+        for line, line_width in font.layout(print_string, box if do_wrap else 0)[1]:
+            if y >= self.height: break
+            if align == "right":
+                x = self.width - line_width
+            elif align == "center":
+                x = left + ((box - line_width) >> 1)
+            else:
+                x = left
+            if len(line) > 0: self._draw_text(line, False, False, font, x, y)
+            y += font.height
         return self
 
-    def draw(self):
+    def render_text_to_bitmap(self, print_string, scale=1, font=None):
+        """
+        Render a line of text, without wrapping, to a Bitmap that blit() can
+        draw anywhere. The most recently used bitmaps are cached, so call this
+        each time a static label is needed rather than keeping the result.
+        Cached bitmaps are shared, so do not draw into them
+
+        Args:
+            print_string (string) The text to render
+            scale        (int)    1 for text() size, 2 for text_2x() size. Default: 1
+            font         (Font)   The typeface to use. Default: the built-in character set
+
+        Returns:
+            The rendered text (Bitmap)
         """
-        Draw the current buffer contents on the screen
+        assert len(print_string) > 0, "ERROR - Zero-length string passed to render_text_to_bitmap()"
+        assert scale in (1, 2), "ERROR - Invalid scale passed to render_text_to_bitmap()"
+        if font is None: font = self._default_font()
+        cache = SSD1306OLED._text_bitmaps
+        SSD1306OLED._text_bitmap_tick += 1
+        key = (print_string, scale, font)
+        entry = cache.get(key)
+        if entry is not None:
+            entry[0] = SSD1306OLED._text_bitmap_tick
+            return entry[1]
+
+        if scale == 1:
+            width = font.measure(print_string)
+        else:
+            # Mirror text_2x()'s layout: glyph columns overlap in pairs
+            width = 0
+            x = 0
+            for char in print_string:
+                glyph_len = font.width(ord(char))
+                if glyph_len > 1: width = max(width, x + glyph_len * 2)
+                x += max(glyph_len - 1, 0) * 2 + 4
+        bitmap = Bitmap(max(width, 1), font.height * scale)
+        self._draw_text(print_string, False, scale == 2, font, 0, 0, bitmap)
+
+        # Evict the least recently used bitmaps to keep within the size limit
+        size = len(bitmap.buffer)
+        for cached in cache.values(): size += len(cached[1].buffer)
+        while size > self.TEXT_BITMAP_CACHE_SIZE and len(cache) > 0:
+            oldest = None
+            for cached_key in cache:
+                if oldest is None or cache[cached_key][0] < cache[oldest][0]: oldest = cached_key
+            size -= len(cache[oldest][1].buffer)
+            del cache[oldest]
+        cache[key] = [SSD1306OLED._text_bitmap_tick, bitmap]
+        return bitmap
+
+    def blit(self, bitmap, x, y, mode="or"):
         """
-        self._render()
+        Draw a bitmap with its top left corner at the specified co-ordinates.
+        Pixels that fall off the screen are clipped
 
-    # ********** PRIVATE METHODS **********
+        Args:
+            bitmap (Bitmap) The image to draw
+            x      (int)    The left X co-ordinate
+            y      (int)    The top Y co-ordinate
+            mode   (string) How the image combines with the screen: "copy" replaces the pixels
+                            under it, "or" draws only its set pixels, "and" clears the screen's pixels
+                            where its are clear, "xor" inverts the screen's pixels where its are set.
+                            Default: "or"
 
-    def _render(self):
+        Returns:
+            The instance (self)
         """
-        Write the display buffer out to I2C
+        assert mode in ("copy", "or", "and", "xor"), "ERROR - Invalid mode passed to blit()"
+
+        # Clip the columns to the screen
+        first = max(0, -x)
+        last = min(bitmap.width, self.width - x)
+        if first >= last or y >= self.height or y + bitmap.height <= 0: return self
+        shift = y & 7
+        for page in range(bitmap.pages):
+            # Only the rows within the image count, even on a partial last page
+            rows = 0xFF
+            if page == bitmap.pages - 1 and bitmap.height & 7: rows = 0xFF >> (8 - (bitmap.height & 7))
+            start = page * bitmap.width
+
+            # Each source page lands across one or two display pages
+            upper = (y >> 3) + page
+            if 0 <= upper < self.pages:
+                self._blit_run(upper * self.width + x - start, bitmap.buffer, start + first, start + last,
+                               shift, 0, (rows << shift) & 0xFF, mode)
+            if shift != 0 and 0 <= upper + 1 < self.pages:
+                self._blit_run((upper + 1) * self.width + x - start, bitmap.buffer, start + first, start + last,
+                               shift, 8, (rows << shift) >> 8, mode)
+        self._mark_dirty(x + first, y, x + last - 1, y + bitmap.height - 1)
+        return self
+
+    def capture(self, x, y, width, height):
         """
-        buffer = bytearray(len(self.buffer) + 1)
-        buffer[1:] = self.buffer
-        buffer[0] = self.SSD1306_WRITETOBUFFER
-        self.i2c.writeto(self.address, bytes(buffer))
+        Copy an area of the display buffer to a new Bitmap, eg. to pre-render a
+        sprite with the drawing methods. Pixels off the screen are clear
 
-    def _coords_to_index(self, x, y):
+        Args:
+            x      (int) The left X co-ordinate
+            y      (int) The top Y co-ordinate
+            width  (int) The width of the area
+            height (int) The height of the area
+
+        Returns:
+            The captured area (Bitmap)
         """
-        Convert pixel co-ordinates to a bytearray index
-        Calling function should check for valid co-ordinates first
+        bitmap = Bitmap(width, height)
+        rows = (1 << height) - 1
+        for column in range(max(0, -x), min(width, self.width - x)):
+            # Gather the display pages the column's pixels are in
+            value = 0
+            shift = 0
+            for page in range(y >> 3, ((y + height - 1) >> 3) + 1):
+                if 0 <= page < self.pages: value |= self.buffer[page * self.width + x + column] << shift
+                shift += 8
+            value = (value >> (y & 7)) & rows
+            index = column
+            while value:
+                bitmap.buffer[index] = value & 0xFF
+                value >>= 8
+                index += width
+        return bitmap
+
+    def clear(self):
         """
-        return ((y >> 3) * self.width) + x
+        Clears the display buffer
 
-    def _index_to_coords(self, idx):
+        Returns:
+            The display object
         """
-        Convert bytearray index to pixel co-ordinates
+        return self.fill_pages(0, self.pages - 1, 0x00)
+
+    def fill(self, pattern=0xFF):
         """
-        y = idx >> 4
-        x = idx - (y << 4)
-        return (x, y)
+        Fill the display buffer with a pattern
 
-    def _draw_text(self, the_string, do_wrap, do_double):
+        Args:
+            pattern (int or bytes) A byte to set every column of eight pixels to, bit 0 at the top,
+                                   or a run of such bytes to repeat across each page. Its length
+                                   must divide the display's width. Default: 0xFF, all pixels set
+
+        Returns:
+            The instance (self)
         """
-        Generic text rendering routine
+        return self.fill_pages(0, self.pages - 1, pattern)
+
+    def fill_pages(self, first_page, last_page=None, pattern=0xFF):
         """
-        x = self.x
-        y = self.y
-        space_size = 4 if do_double else 1
-        bit_max = 16 if do_double else 8
+        Fill one or more pages, eight-pixel-high rows, of the display buffer with a pattern
 
-        for i in range(0, len(the_string)):
-            glyph = self.CHARSET[ord(the_string[i]) - 32]
-            col_0 = self._flip(glyph[0])
+        Args:
+            first_page (int)          The first page to fill, 0 to 3 or 7, depending on model
+            last_page  (int)          The last page to fill. Default: the first page
+            pattern    (int or bytes) The pattern, as for fill(). Default: 0xFF
 
-            if do_wrap:
-                if x + len(glyph) * (2 if do_double else 1) >= self.width:
-                    if y + bit_max < self.height:
-                        x = 0
-                        y += bit_max
-                    else:
-                        return self
+        Returns:
+            The instance (self)
+        """
+        if last_page is None: last_page = first_page
+        assert 0 <= first_page <= last_page < self.pages, "ERROR - Invalid pages passed to fill_pages()"
+        row = self._pattern_row(pattern)
+        buffer = self.buffer
+        width = self.width
+        for page in range(first_page, last_page + 1):
+            buffer[page * width:(page + 1) * width] = row
+        self._mark_dirty(0, first_page << 3, width - 1, (last_page << 3) + 7)
+        return self
 
-            for j in range(1, len(glyph) + 1):
-                if j == len(glyph):
-                    if do_double: break
-                    col_1 = self._flip(glyph[j - 1])
-                else:
-                    col_1 = self._flip(glyph[j])
+    def clear_pages(self, first_page, last_page=None):
+        """
+        Clear one or more pages, eight-pixel-high rows, of the display buffer
 
-                if do_double:
-                    col_0_right = self._stretch(col_0)
-                    col_0_left = col_0_right
-                    col_1_right = self._stretch(col_1)
-                    col_1_left = col_1_right
-
-                    for a in range(6, -1, -1):
-                        for b in range(1, 3):
-                            if (col_0 >> a & 3 == 3 - b) and (col_1 >> a & 3 == b):
-                                col_0_right |= (1 << ((a * 2) + b))
-                                col_1_left |= (1 << ((a * 2) + 3 - b))
-
-                z = (y - ((y >> 3) << 3)) - 1
-
-                for k in range(0, bit_max):
-                    if ((y + k) % 8) == 0 and k > 0:
-                        z = 0
-                    else:
-                        z += 1
+        Args:
+            first_page (int) The first page to clear, 0 to 3 or 7, depending on model
+            last_page  (int) The last page to clear. Default: the first page
 
-                    if do_double:
-                        if x < self.width: self._char_plot(x, y, k, col_0_left, z)
-                        if x + 1 < self.width: self._char_plot(x + 1, y, k, col_0_right, z)
-                        if x + 2 < self.width: self._char_plot(x + 2, y, k, col_1_left, z)
-                        if x + 3 < self.width: self._char_plot(x + 3, y, k, col_1_right, z)
-                    else:
-                        if x < self.width: self._char_plot(x, y, k, col_0, z)
+        Returns:
+            The instance (self)
+        """
+        return self.fill_pages(first_page, last_page, 0x00)
 
-                x += (2 if do_double else 1)
-                if x >= self.width:
-                    if not do_wrap: return self
-                    if y + bit_max < self.height:
-                        x = 0
-                        y += bit_max
-                    else:
-                        break
-                col_0 = col_1
+    def clear_region(self, x, y, width, height):
+        """
+        Clear a rectangular area of the display buffer. Areas off the screen are ignored
 
-            # Add spacer if we can
-            if i < len(the_string) - 1:
-                x += space_size
-                if x >= self.width:
-                    if not do_wrap: return self
-                    if y + bit_max < self.height:
-                        x = 0
-                        y += bit_max
-                    else:
-                        break
+        Args:
+            x      (int) The area's left X co-ordinate
+            y      (int) The area's top Y co-ordinate
+            width  (int) The area's width
+            height (int) The area's height
+
+        Returns:
+            The instance (self)
+        """
+        tox = min(x + width, self.width) - 1
+        toy = min(y + height, self.height) - 1
+        x = max(x, 0)
+        y = max(y, 0)
+        if x <= tox and y <= toy: self._fill_area(x, y, tox, toy, 0)
         return self
 
-    def _flip(self, value):
+    def draw(self, full=False):
         """
-        Rotates the character array from the saved state
-        to that required by the screen orientation
+        Draw the current buffer contents on the screen. Only those areas
+        of the buffer changed since the last call are sent to the display
+
+        Args:
+            full (bool) Send the whole buffer, eg. after writing to it directly. Default: False
         """
-        flipped = 0
-        for i in range (0, 8):
-            if (value & (1 << i)) > 0:
-                flipped += (1 << (7 - i))
-        return flipped
+        if self.is_scrolling: full = self._end_scroll()
+        if full:
+            self._mark_dirty(0, 0, self.width - 1, self.height - 1)
+            self._shadow_stale = True
+        self._render()
 
-    def _char_plot(self, x, y, k, c, a):
+    def set_frame_diff(self, is_enabled=True):
         """
-        Write a pixel from a character glyph to the buffer
+        Keep a copy of what the panel shows and compare the buffer with it
+        on each draw(), so that only bytes which really changed are sent.
+        This helps when frames are cleared and redrawn in full, as most of
+        their bytes end up unchanged. It costs a second buffer's RAM
+
+        Args:
+            is_enabled (bool) Should draw() compare frames. Default: True
+
+        Returns:
+            The instance (self)
         """
-        b = self._coords_to_index(x, y + k)
-        if c & (1 << k) != 0: self.buffer[b] |= (1 << a)
+        if is_enabled and self._shadow is None:
+            self._shadow = bytearray(len(self.buffer))
+            self._shadow_view = memoryview(self._shadow)
+            # The panel's contents are unknown until the next full draw
+            self._shadow_stale = True
+        elif not is_enabled:
+            self._shadow = None
+            self._shadow_view = None
+        return self
 
-    def _stretch(self, x):
+    def set_profiling(self, is_enabled=True):
         """
-        Pixel-doubles an 8-bit value to 16 bits
+        Record, for each drawing method, the calls made, the time they took,
+        the pixels they changed and, on MicroPython, the memory they
+        allocated, plus the bytes and I2C transactions sent. Read the
+        figures with stats().
+
+        Profiling replaces the instance's methods with measuring versions,
+        so when it is off the driver runs with no profiling cost at all.
+        Times include those of any profiled methods called in turn; pixels
+        are counted against the outermost call, by comparing just the area it
+        marked as changed with a copy kept since the last call. Changes made
+        to the buffer by other means may be counted against the next call
+        that marks the same area
+
+        Args:
+            is_enabled (bool) Should the driver be profiled. Default: True
+
+        Returns:
+            The instance (self)
         """
-        x = (x & 0xF0) << 4 | (x & 0x0F)
-        x = (x << 2 | x) & 0x3333
-        x = (x << 1 | x) & 0x5555
-        x = x | x << 1
-        return x
+        if is_enabled and self._profile is None:
+            self._profile = {"calls": {}, "bytes": 0, "transactions": 0, "depth": 0,
+                             "snapshot": bytearray(self.buffer),
+                             "lo": [0] * self.pages, "hi": [0] * self.pages}
+            for name in self.PROFILED: setattr(self, name, self._profiled(name))
+            for name in self.PROFILED_BUS: setattr(self, name, self._counted(name))
+        elif not is_enabled and self._profile is not None:
+            # Uncover the class's own methods
+            for name in self.PROFILED + self.PROFILED_BUS: delattr(self, name)
+            self._profile = None
+        return self
 
-    def _set_rst(self, is_on=True):
+    def stats(self):
         """
-        Select GPIO pin setting mechanism by Python type.
+        Report the figures recorded since profiling began, or since reset_stats()
+
+        Returns:
+            A dict: "calls", a dict of the methods called, each with a "count",
+            total "us", "pixels" changed and, on MicroPython, bytes "alloc"ated;
+            the "bytes" and "transactions" sent; and "bytes_per_draw"
+        """
+        assert self._profile is not None, "ERROR - stats() called without set_profiling()"
+        profile = self._profile
+        calls = {}
+        for name, entry in profile["calls"].items():
+            if entry[0] == 0: continue
+            calls[name] = {"count": entry[0], "us": entry[1], "pixels": entry[2]}
+            if entry[3] is not None: calls[name]["alloc"] = entry[3]
+        draws = profile["calls"]["draw"][0]
+        return {"calls": calls,
+                "bytes": profile["bytes"],
+                "transactions": profile["transactions"],
+                "bytes_per_draw": profile["bytes"] / draws if draws else 0}
+
+    def reset_stats(self):
+        """
+        Zero the profiling figures
+
+        Returns:
+            The instance (self)
+        """
+        assert self._profile is not None, "ERROR - reset_stats() called without set_profiling()"
+        for entry in self._profile["calls"].values():
+            entry[0] = entry[1] = entry[2] = 0
+            if entry[3] is not None: entry[3] = 0
+        self._profile["bytes"] = 0
+        self._profile["transactions"] = 0
+        return self
+
+    def set_max_transfer(self, size=None):
+        """
+        Limit the size of each I2C write. Some bus implementations, eg.
+        SMBus, cap transfers or handle large ones badly. Longer runs of
+        the buffer are sent in chunks, each starting with its own control
+        byte, straight from the buffer
 
         Args:
-            is_on (Bool) Are we toggling RST on?
+            size (int) The most bytes per write, including the control byte, from 7 up. Default: no limit
+
+        Returns:
+            The instance (self)
         """
-        if self.is_micropython:
-            if is_on:
-                self.rst.on()
+        # The address window command has to go in one write
+        assert size is None or size >= len(self._window), "ERROR - Invalid transfer size in set_max_transfer()"
+        self.max_transfer = size
+        self._chunk = 0 if size is None else size - 1
+        self._full_cost = self._render_window(0, self.width - 1, 0, self.pages - 1, False)
+        return self
+
+    def show_frame(self, frame):
+        """
+        Decode a FrameCodec-encoded frame straight into the display buffer.
+        Delta frames apply to whatever the buffer holds, normally the
+        previous frame. Only the changed areas are marked for draw()
+
+        Args:
+            frame (bytes) The encoded frame
+
+        Returns:
+            The instance (self)
+        """
+        FrameCodec.decode(frame, self.buffer, self._mark_index_range)
+        return self
+
+    def play_frames(self, frames, fps=10):
+        """
+        Decode and draw a sequence of FrameCodec-encoded frames at a steady rate.
+        Frames are decoded one at a time, so the sequence can be a generator
+        reading from a file
+
+        Args:
+            frames (iterable) The encoded frames
+            fps    (int)      The target frame rate. Default: 10
+
+        Returns:
+            The instance (self)
+        """
+        import time
+        ticks_ms, ticks_diff = self._clock()
+        fps = max(fps, 1)
+        start = ticks_ms()
+        shown = 0
+        for frame in frames:
+            self.show_frame(frame).draw()
+            shown += 1
+            # Each frame is due at a whole-millisecond offset from the start, so the rate doesn't drift
+            wait = shown * 1000 // fps - ticks_diff(ticks_ms(), start)
+            if wait > 0:
+                time.sleep(wait / 1000)
             else:
-                self.rst.off()
-        else:
-            self.rst.value = is_on
+                # Running late: don't try to catch up
+                start = ticks_ms()
+                shown = 0
+        return self
+
+    async def draw_async(self, full=False):
+        """
+        Draw the display buffer like draw(), but yield to other tasks after
+        each page sent, so that they keep running during the transfer.
+        The areas to send are settled before the first yield: drawing
+        during the transfer is safe, and changes will go out on the next
+        draw. Don't call draw() while a draw_async() is running
+
+        Args:
+            full (bool) Send the whole buffer. Default: False
+        """
+        asyncio = self._asyncio()
+        # Wait for any draw already under way to finish its window
+        while self._drawing: await asyncio.sleep(0)
+        self._drawing = True
+        steps = self._draw_steps(full)
+        try:
+            for _ in steps: await asyncio.sleep(0)
+        finally:
+            # On cancellation, put back the areas not sent
+            steps.close()
+            self._drawing = False
+
+    # ********** PRIVATE METHODS **********
+
+    def _draw_steps(self, full=False):
+        """
+        Draw the display buffer a page at a time. The areas to send are
+        settled before the first page goes. If the draw is abandoned, by
+        close() or a bus error, the areas not sent are marked to go next time
+
+        Args:
+            full (bool) Send the whole buffer. Default: False
+
+        Yields:
+            None, after each page sent
+        """
+        if self.is_scrolling: full = self._end_scroll()
+        if full:
+            self._mark_dirty(0, 0, self.width - 1, self.height - 1)
+            self._shadow_stale = True
+        # Copy the windows: the table is reused by any draw made between steps
+        windows = bytes(self._runs[:self._plan_render() << 2])
+        self._clear_dirty()
+        sent = 0
+        unsent_page = 0
+        try:
+            while sent < len(windows):
+                col_start, col_end, page_start, page_end = windows[sent:sent + 4]
+                unsent_page = page_start
+                self._set_window(col_start, col_end, page_start, page_end)
+                # Continue the window a page per transaction
+                for page in range(page_start, page_end + 1):
+                    start = page * self.width + col_start
+                    self._write_data(start, start + col_end - col_start + 1)
+                    unsent_page = page + 1
+                    yield
+                sent += 4
+        finally:
+            while sent < len(windows):
+                col_start, col_end, page_start, page_end = windows[sent:sent + 4]
+                page_start = max(page_start, unsent_page)
+                if page_start <= page_end: self._mark_dirty(col_start, page_start << 3, col_end, (page_end << 3) + 7)
+                sent += 4
+
+    def _init_steps(self):
+        """
+        Set up the display, then clear it a page at a time
+
+        Yields:
+            None, after the settings and after each page sent
+        """
+        self._send_init()
+        yield
+        self.clear()
+        for _ in self._draw_steps(True): yield
+
+    def _send_init(self):
+        """
+        Write the display settings. There's no need to set the address
+        window here: every draw() sets its own
+        """
+        init = bytearray(self.INIT_SEQUENCE)
+        init[self.INIT_MULTIPLEX] = self.height - 1
+        init[self.INIT_COMPINS] = 0x02 if self.height in (16, 32) else 0x12
+        if self._chunk == 0 or len(init) <= self.max_transfer:
+            self.i2c.writeto(self.address, init)
+        else:
+            self.send_commands(*init[1:])
+
+    @staticmethod
+    def _asyncio():
+        """
+        Get the platform's asyncio module
+
+        Returns:
+            uasyncio on older MicroPython builds, otherwise asyncio
+        """
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        return asyncio
+
+    @staticmethod
+    def _clock(micro=False):
+        """
+        Get a tick counter and difference function
+
+        Args:
+            micro (bool) Count microseconds (True) or milliseconds (False). Default: False
+
+        Returns:
+            time.ticks_ms() or time.ticks_us(), and time.ticks_diff(), where available, otherwise CPython equivalents
+        """
+        import time
+        try:
+            return (time.ticks_us if micro else time.ticks_ms, time.ticks_diff)
+        except AttributeError:
+            if micro and hasattr(time, "perf_counter_ns"): return (lambda: time.perf_counter_ns() // 1000, lambda a, b: a - b)
+            scale = 1000000 if micro else 1000
+            return (lambda: int(time.monotonic() * scale), lambda a, b: a - b)
+
+    def _profiled(self, name):
+        """
+        Make a measuring version of a public method
+
+        Args:
+            name (string) The method's name
+
+        Returns:
+            The measuring function
+        """
+        import gc
+        method = getattr(self.__class__, name)
+        profile = self._profile
+        ticks, ticks_diff = self._clock(True)
+        mem_alloc = getattr(gc, "mem_alloc", None)
+        # Count, microseconds, pixels changed and bytes allocated
+        entry = [0, 0, 0, 0 if mem_alloc else None]
+        profile["calls"][name] = entry
+
+        compare = name not in self.PROFILED_UNCHANGING
+
+        def measured(*args, **kwargs):
+            outermost = compare and profile["depth"] == 0
+            # Set the changed areas aside, outside the timed part, so the call's own can be found
+            if outermost: self._set_dirty_aside(profile)
+            profile["depth"] += 1
+            allocated = mem_alloc() if mem_alloc else 0
+            start = ticks()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                entry[1] += ticks_diff(ticks(), start)
+                if mem_alloc: entry[3] += max(mem_alloc() - allocated, 0)
+                entry[0] += 1
+                profile["depth"] -= 1
+                if outermost: entry[2] += self._count_changes(profile)
+
+        return measured
+
+    def _counted(self, name):
+        """
+        Make a version of a bus-writing method that counts what it sends
+
+        Args:
+            name (string) The method's name: one of PROFILED_BUS
+
+        Returns:
+            The counting function
+        """
+        method = getattr(self.__class__, name)
+        profile = self._profile
+
+        def counted(*args):
+            if name == "_write_data":
+                length = args[1] - args[0]
+                transactions = 1 if length == len(self.buffer) and self._chunk == 0 else self._transactions(length)
+            else:
+                length = len(self._window) - 1 if name == "_set_window" else len(args)
+                transactions = 1
+            profile["transactions"] += transactions
+            profile["bytes"] += length + transactions
+            return method(self, *args)
+
+        return counted
+
+    def _set_dirty_aside(self, profile):
+        """
+        Move the record of changed areas into the profile, leaving it clear
+        so that it records only what the next call changes
+
+        Args:
+            profile (dict) The profiling figures
+        """
+        lo = profile["lo"]
+        hi = profile["hi"]
+        for page in range(self.pages):
+            lo[page] = self._dirty_lo[page]
+            hi[page] = self._dirty_hi[page]
+        self._clear_dirty()
+
+    def _count_changes(self, profile):
+        """
+        Count the pixels a call changed, by comparing the areas it marked
+        with the profile's copy of the buffer, which is then brought up to
+        date. The areas set aside before the call are marked again
+
+        Args:
+            profile (dict) The profiling figures
+
+        Returns:
+            The number of pixels changed
+        """
+        buffer = self.buffer
+        snapshot = profile["snapshot"]
+        count = 0
+        for page in range(self.pages):
+            lo = self._dirty_lo[page]
+            hi = self._dirty_hi[page]
+            if lo <= hi:
+                start = page * self.width
+                for i in range(start + lo, start + hi + 1):
+                    if buffer[i] != snapshot[i]: count += bin(buffer[i] ^ snapshot[i]).count("1")
+                snapshot[start + lo:start + hi + 1] = buffer[start + lo:start + hi + 1]
+            if profile["lo"][page] < lo: self._dirty_lo[page] = profile["lo"][page]
+            if profile["hi"][page] > hi: self._dirty_hi[page] = profile["hi"][page]
+        return count
+
+    def _scroll_parameters(self, start_page, end_page, interval):
+        """
+        Check a scroll's page band and step interval
+
+        Args:
+            start_page (int) The band's top page
+            end_page   (int) The band's bottom page, or None for the last page
+            interval   (int) The frames between steps
+
+        Returns:
+            The start page, end page and the interval's command code
+        """
+        if end_page is None: end_page = self.pages - 1
+        assert 0 <= start_page <= end_page < self.pages, "ERROR - Invalid pages passed for scrolling"
+        assert interval in self.SCROLL_INTERVALS, "ERROR - Invalid interval passed for scrolling"
+        return (start_page, end_page, self.SCROLL_INTERVALS[interval])
+
+    def _end_scroll(self):
+        """
+        Stop any hardware scroll. Vertical scrolling moves the display's
+        start line, so that is reset too
+
+        Returns:
+            True, as the panel no longer matches the buffer
+        """
+        self.send_commands(self.SSD1306_DEACTIVATE_SCROLL, self.SSD1306_SETSTARTLINE)
+        self.is_scrolling = False
+        # The display's RAM is no longer what was last sent
+        self._shadow_stale = True
+        return True
+
+    def _render(self):
+        """
+        Write the changed areas of the display buffer out to I2C.
+        Each run of consecutive dirty pages is sent as a single
+        COLUMNADDR/PAGEADDR window spanning the run's changed columns.
+        If the windows would cost more bus time than the whole buffer,
+        the whole buffer is sent instead. Nothing is allocated unless
+        the bus takes more than one write: see _write_data()
+        """
+        runs = self._runs
+        for i in range(0, self._plan_render() << 2, 4):
+            self._render_window(runs[i], runs[i + 1], runs[i + 2], runs[i + 3], True)
+        self._clear_dirty()
+
+    def _plan_render(self):
+        """
+        Settle the areas of the buffer the next draw will send, and list
+        them in self._runs. If the windows would cost more bus time than
+        the whole buffer, the list is just the whole buffer
+
+        Returns:
+            The number of windows listed
+        """
+        if self._shadow is not None:
+            if self._shadow_stale:
+                self._mark_dirty(0, 0, self.width - 1, self.height - 1)
+                self._shadow_stale = False
+            else:
+                self._diff_dirty()
+        runs = self._runs
+        count = self._find_windows()
+        cost = 0
+        for i in range(0, count << 2, 4):
+            cost += self._render_window(runs[i], runs[i + 1], runs[i + 2], runs[i + 3], False)
+        if cost < self._full_cost: return count
+        runs[0] = 0
+        runs[1] = self.width - 1
+        runs[2] = 0
+        runs[3] = self.pages - 1
+        return 1
+
+    def _find_windows(self):
+        """
+        List in self._runs the windows covering the dirty areas of the buffer,
+        one per run of consecutive dirty pages
+
+        Returns:
+            The number of windows listed
+        """
+        lo = self._dirty_lo
+        hi = self._dirty_hi
+        runs = self._runs
+        count = 0
+        page = 0
+        while page < self.pages:
+            if lo[page] > hi[page]:
+                page += 1
+                continue
+            # Extend the window over any following dirty pages
+            first = page
+            col_start = lo[page]
+            col_end = hi[page]
+            while page + 1 < self.pages and lo[page + 1] <= hi[page + 1]:
+                page += 1
+                col_start = min(col_start, lo[page])
+                col_end = max(col_end, hi[page])
+            i = count << 2
+            runs[i] = col_start
+            runs[i + 1] = col_end
+            runs[i + 2] = first
+            runs[i + 3] = page
+            count += 1
+            page += 1
+        return count
+
+    def _clear_dirty(self):
+        """
+        Record that the whole buffer is on the panel
+        """
+        for page in range(self.pages):
+            self._dirty_lo[page] = self.width
+            self._dirty_hi[page] = -1
+
+    def _render_window(self, col_start, col_end, page_start, page_end, send=True):
+        """
+        Write a rectangular area of the display buffer out to I2C.
+        The display is in horizontal addressing mode, so the data
+        wraps from one page's last column to the next page's first
+
+        Args:
+            col_start  (int)  The first column in the window
+            col_end    (int)  The last column in the window
+            page_start (int)  The first page in the window
+            page_end   (int)  The last page in the window
+            send       (bool) Write the window out (True) or just price it (False). Default: True
+
+        Returns:
+            The window's bus cost in byte-times
+        """
+        span = col_end - col_start + 1
+        full_width = span == self.width
+        if full_width:
+            transactions = self._transactions(span * (page_end - page_start + 1))
+        else:
+            transactions = self._transactions(span) * (page_end - page_start + 1)
+        # The window command, then the data and a control byte per transaction
+        cost = len(self._window) + self.TRANSACTION_COST + span * (page_end - page_start + 1) + transactions * (self.TRANSACTION_COST + 1)
+        if not send: return cost
+
+        self._set_window(col_start, col_end, page_start, page_end)
+        if full_width:
+            # Full-width pages are contiguous in the buffer
+            self._write_data(page_start * self.width, (page_end + 1) * self.width)
+        else:
+            # The display's address pointer carries over between
+            # transactions, so send the window one page at a time
+            for page in range(page_start, page_end + 1):
+                start = page * self.width + col_start
+                self._write_data(start, start + span)
+        return cost
+
+    def _set_window(self, col_start, col_end, page_start, page_end):
+        """
+        Set the display's address window, ready for data
+
+        Args:
+            col_start  (int) The first column in the window
+            col_end    (int) The last column in the window
+            page_start (int) The first page in the window
+            page_end   (int) The last page in the window
+        """
+        window = self._window
+        window[2] = col_start
+        window[3] = col_end
+        window[5] = page_start
+        window[6] = page_end
+        self.i2c.writeto(self.address, window)
+
+    def _diff_dirty(self):
+        """
+        Narrow each page's dirty columns to those that differ from what the
+        panel shows, as recorded in the shadow buffer
+        """
+        lo = self._dirty_lo
+        hi = self._dirty_hi
+        tx = self._tx
+        shadow = self._shadow
+        for page in range(self.pages):
+            if lo[page] > hi[page]: continue
+            base = page * self.width
+            start = base + lo[page]
+            end = base + hi[page] + 1
+            # Quick check for an unchanged run, then trim unchanged bytes from each end.
+            # The transmit buffer is one byte ahead of the frame
+            if self.buffer[start:end] == self._shadow_view[start:end]:
+                start = end
+            while start < end and tx[start + 1] == shadow[start]: start += 1
+            if start == end:
+                lo[page] = self.width
+                hi[page] = -1
+                continue
+            while tx[end] == shadow[end - 1]: end -= 1
+            lo[page] = start - base
+            hi[page] = end - 1 - base
+
+    def _write_data(self, start, end):
+        """
+        Write a run of the display buffer out to I2C without copying it.
+        The data control byte is written into the transmit buffer just
+        ahead of the run, and the byte it replaces restored afterwards.
+        A whole-buffer write allocates nothing. Any other write allocates
+        one small memoryview slice, as machine.I2C.writeto() can't be
+        given a start and end
+
+        Args:
+            start (int) The buffer index of the first byte to send
+            end   (int) The buffer index after the last byte to send
+        """
+        shadow = self._shadow_view
+        if start == 0 and end == len(self.buffer) and self._chunk == 0:
+            self.i2c.writeto(self.address, self._tx)
+            if shadow is not None: shadow[:] = self.buffer
+            return
+        # Send the run in chunks no larger than the bus allows, each with its own control byte
+        tx = self._tx
+        chunk = self._chunk or end - start
+        while start < end:
+            stop = min(start + chunk, end)
+            saved = tx[start]
+            tx[start] = self.SSD1306_WRITETOBUFFER
+            try:
+                self.i2c.writeto(self.address, self._tx_view[start:stop + 1])
+            finally:
+                # Restore the frame byte even if the bus fails
+                tx[start] = saved
+            # Record only what the panel has received
+            if shadow is not None: shadow[start:stop] = self.buffer[start:stop]
+            start = stop
+
+    def _transactions(self, length):
+        """
+        Count the I2C transactions needed to send a run of the display buffer
+
+        Args:
+            length (int) The number of bytes in the run
+
+        Returns:
+            The number of transactions
+        """
+        if self._chunk == 0: return 1
+        return (length + self._chunk - 1) // self._chunk
+
+    def _pattern_row(self, pattern):
+        """
+        Get a page-wide row of a fill pattern. All-clear and all-set rows are
+        preallocated; the last other pattern's row is kept for re-use
+
+        Args:
+            pattern (int or bytes) The pattern, as for fill()
+
+        Returns:
+            The row, a buffer as long as the display is wide
+        """
+        if pattern == 0x00: return self._zeros
+        if pattern == 0xFF: return self._ones
+        if pattern != self._fill_pattern:
+            if isinstance(pattern, int):
+                assert 0x00 <= pattern <= 0xFF, "ERROR - Invalid pattern passed to fill()"
+                unit = bytes([pattern])
+            else:
+                unit = bytes(pattern)
+                assert 0 < len(unit) and self.width % len(unit) == 0, "ERROR - Invalid pattern passed to fill()"
+            self._fill_row = memoryview(unit * (self.width // len(unit)))
+            # Keep a copy, in case the caller changes the pattern
+            self._fill_pattern = pattern if isinstance(pattern, int) else unit
+        return self._fill_row
+
+    def _fill_area(self, x, y, tox, toy, colour):
+        """
+        Set or clear every pixel in a rectangular area of the buffer a page
+        at a time: full pages are slice-assigned, partial pages are masked.
+        Calling function should check for valid co-ordinates first
+
+        Args:
+            x      (int) The left X co-ordinate
+            y      (int) The top Y co-ordinate
+            tox    (int) The right X co-ordinate
+            toy    (int) The bottom Y co-ordinate
+            colour (int) The colour of the pixels: 1 for set, 0 for clear
+        """
+        buffer = self.buffer
+        first = y >> 3
+        last = toy >> 3
+        for page in range(first, last + 1):
+            mask = 0xFF
+            if page == first: mask &= (0xFF << (y & 7)) & 0xFF
+            if page == last: mask &= 0xFF >> (7 - (toy & 7))
+            start = page * self.width + x
+            end = page * self.width + tox + 1
+            if mask == 0xFF:
+                buffer[start:end] = (self._ones if colour else self._zeros)[:end - start]
+            elif colour:
+                for i in range(start, end): buffer[i] |= mask
+            else:
+                mask ^= 0xFF
+                for i in range(start, end): buffer[i] &= mask
+        self._mark_dirty(x, y, tox, toy)
+
+    def _draw_arcs(self, x, y, tox, toy, x_radius, y_radius, colour, fill):
+        """
+        Draw four elliptical quarter arcs centred on the corners of a
+        rectangle, and the straight edges joining them, as horizontal spans.
+        With a zero-size rectangle this is an ellipse or a circle.
+
+        For each row the arcs cover, the half-width of the shape is the
+        largest integer dx inside an ellipse with radii half a pixel larger
+        than those given: (2dx)^2(2ry+1)^2 + (2dy)^2(2rx+1)^2 <= (2rx+1)^2(2ry+1)^2.
+        The test is made on the difference between the two sides, which is
+        kept up to date by additions as dx and dy step, so the numbers stay
+        near the curve and small enough for MicroPython's small ints. An
+        outline row runs from just outside the next row's half-width out
+        to its own, so the curve has no gaps
+
+        Args:
+            x        (int)  The top-left corner centre's X co-ordinate
+            y        (int)  The top-left corner centre's Y co-ordinate
+            tox      (int)  The bottom-right corner centre's X co-ordinate
+            toy      (int)  The bottom-right corner centre's Y co-ordinate
+            x_radius (int)  The horizontal radius of the arcs
+            y_radius (int)  The vertical radius of the arcs
+            colour   (int)  The colour of the pixels: 1 for set, 0 for clear
+            fill     (bool) Should the shape be solid (true) or outline (false)
+        """
+        a = (2 * x_radius + 1) ** 2
+        b = (2 * y_radius + 1) ** 2
+        dx = x_radius
+        width = dx
+        # The left side less the right for (dx, dy) = (rx, 1), and the changes
+        # it takes as dy grows and dx shrinks by one
+        error = 4 * a - (4 * x_radius + 1) * b
+        grow = 12 * a
+        shrink = 4 * b * (2 * dx - 1)
+        grow_step = 8 * a
+        shrink_step = 8 * b
+        for dy in range(1, y_radius + 2):
+            # Find the half-width of the next row out
+            while dx >= 0 and error > 0:
+                error -= shrink
+                shrink -= shrink_step
+                dx -= 1
+            error += grow
+            grow += grow_step
+            top = y - dy + 1
+            bottom = toy + dy - 1
+            if fill:
+                self._hspan(x - width, tox + width, top, colour)
+                if bottom != top: self._hspan(x - width, tox + width, bottom, colour)
+            else:
+                inner = min(dx + 1, width)
+                self._hspan(x - width, x - inner, top, colour)
+                self._hspan(tox + inner, tox + width, top, colour)
+                if bottom != top:
+                    self._hspan(x - width, x - inner, bottom, colour)
+                    self._hspan(tox + inner, tox + width, bottom, colour)
+            width = dx
+
+        # Join the arcs
+        left = x - x_radius
+        right = tox + x_radius
+        if fill:
+            for row in range(y + 1, toy): self._hspan(left, right, row, colour)
+        else:
+            self._hspan(x + 1, tox - 1, y - y_radius, colour)
+            self._hspan(x + 1, tox - 1, toy + y_radius, colour)
+            for row in range(y + 1, toy):
+                self._hspan(left, left, row, colour)
+                self._hspan(right, right, row, colour)
+        self._mark_dirty(left, y - y_radius, right, toy + y_radius)
+
+    def _hspan(self, x, tox, y, colour):
+        """
+        Set or clear a horizontal run of pixels, clipped to the screen.
+        Does not mark the buffer as dirty: the calling function should
+
+        Args:
+            x      (int) The left X co-ordinate
+            tox    (int) The right X co-ordinate
+            y      (int) The Y co-ordinate
+            colour (int) The colour of the pixels: 1 for set, 0 for clear
+        """
+        if y < 0 or y >= self.height: return
+        x = max(x, 0)
+        tox = min(tox, self.width - 1)
+        if x > tox: return
+        start = (y >> 3) * self.width
+        buffer = self.buffer
+        if colour:
+            bit = 1 << (y & 7)
+            for i in range(start + x, start + tox + 1): buffer[i] |= bit
+        else:
+            bit = ~(1 << (y & 7))
+            for i in range(start + x, start + tox + 1): buffer[i] &= bit
+
+    def _blit_run(self, offset, source, start, end, shift, down, mask, mode):
+        """
+        Combine a run of bitmap bytes with the display buffer. Each source byte
+        is shifted left by shift then right by down, so a byte split across two
+        pages supplies its low part to one page and its high part to the next
+
+        Args:
+            offset (int)    Add to a source index to get the buffer index
+            source (bytes)  The bitmap data
+            start  (int)    The index of the first source byte
+            end    (int)    The index after the last source byte
+            shift  (int)    The left shift
+            down   (int)    The right shift
+            mask   (int)    The bits of each buffer byte the bitmap covers
+            mode   (string) "copy", "or", "and" or "xor"
+        """
+        buffer = self.buffer
+        if mode == "or":
+            for i in range(start, end): buffer[i + offset] |= ((source[i] << shift) >> down) & mask
+        elif mode == "xor":
+            for i in range(start, end): buffer[i + offset] ^= ((source[i] << shift) >> down) & mask
+        elif mode == "and":
+            keep = 0xFF ^ mask
+            for i in range(start, end): buffer[i + offset] &= ((source[i] << shift) >> down) | keep
+        elif mask == 0xFF and shift == 0:
+            buffer[start + offset:end + offset] = memoryview(source)[start:end]
+        else:
+            keep = 0xFF ^ mask
+            for i in range(start, end):
+                buffer[i + offset] = (buffer[i + offset] & keep) | (((source[i] << shift) >> down) & mask)
+
+    def _clip_line(self, x, y, tox, toy, left, top, right, bottom):
+        """
+        Clip a line to a rectangle using integer Cohen-Sutherland
+
+        Args:
+            x      (int) The start X co-ordinate
+            y      (int) The start Y co-ordinate
+            tox    (int) The end X co-ordinate
+            toy    (int) The end Y co-ordinate
+            left   (int) The rectangle's left X co-ordinate
+            top    (int) The rectangle's top Y co-ordinate
+            right  (int) The rectangle's right X co-ordinate
+            bottom (int) The rectangle's bottom Y co-ordinate
+
+        Returns:
+            The clipped co-ordinates as a tuple, or None if the line misses the rectangle
+        """
+        for _ in range(8):
+            code = self._outcode(x, y, left, top, right, bottom)
+            to_code = self._outcode(tox, toy, left, top, right, bottom)
+            if code | to_code == 0: return (x, y, tox, toy)
+            if code & to_code != 0: return None
+            outside = code if code != 0 else to_code
+            if outside & 1:
+                nx, ny = x + self._div_round((tox - x) * (top - y), toy - y), top
+            elif outside & 2:
+                nx, ny = x + self._div_round((tox - x) * (bottom - y), toy - y), bottom
+            elif outside & 4:
+                nx, ny = left, y + self._div_round((toy - y) * (left - x), tox - x)
+            else:
+                nx, ny = right, y + self._div_round((toy - y) * (right - x), tox - x)
+            if outside == code:
+                x, y = nx, ny
+            else:
+                tox, toy = nx, ny
+        return None
+
+    def _outcode(self, x, y, left, top, right, bottom):
+        """
+        Calculate a point's Cohen-Sutherland region code:
+        bit 0 above, bit 1 below, bit 2 left, bit 3 right
+        """
+        code = 0
+        if y < top: code = 1
+        elif y > bottom: code = 2
+        if x < left: code |= 4
+        elif x > right: code |= 8
+        return code
+
+    def _div_round(self, a, b):
+        """
+        Integer division rounded to the nearest whole number
+        """
+        if b < 0:
+            a = -a
+            b = -b
+        return ((a << 1) + b) // (b << 1)
+
+    def _mark_dirty(self, x, y, tox, toy):
+        """
+        Record that a rectangular area of the buffer has changed and needs
+        to be sent to the display. Off-screen areas are clipped
+
+        Args:
+            x   (int) The left X co-ordinate
+            y   (int) The top Y co-ordinate
+            tox (int) The right X co-ordinate
+            toy (int) The bottom Y co-ordinate
+        """
+        x = max(x, 0)
+        tox = min(tox, self.width - 1)
+        if x > tox: return
+        for page in range(max(y, 0) >> 3, (min(toy, self.height - 1) >> 3) + 1):
+            if x < self._dirty_lo[page]: self._dirty_lo[page] = x
+            if tox > self._dirty_hi[page]: self._dirty_hi[page] = tox
+
+    def _mark_index_range(self, start, end):
+        """
+        Record that a run of buffer bytes has changed and needs to be sent to the display
+
+        Args:
+            start (int) The index of the first changed byte
+            end   (int) The index after the last changed byte
+        """
+        first = start // self.width
+        last = (end - 1) // self.width
+        if first == last:
+            self._mark_dirty(start - first * self.width, first << 3, end - 1 - last * self.width, first << 3)
+        else:
+            self._mark_dirty(start - first * self.width, first << 3, self.width - 1, first << 3)
+            self._mark_dirty(0, (first + 1) << 3, self.width - 1, (last << 3) - 1)
+            self._mark_dirty(0, last << 3, end - 1 - last * self.width, last << 3)
+
+    def _coords_to_index(self, x, y):
+        """
+        Convert pixel co-ordinates to a bytearray index
+        Calling function should check for valid co-ordinates first
+        """
+        return ((y >> 3) * self.width) + x
+
+    def _index_to_coords(self, idx):
+        """
+        Convert bytearray index to pixel co-ordinates
+        """
+        y = idx >> 4
+        x = idx - (y << 4)
+        return (x, y)
+
+    def _draw_text(self, the_string, do_wrap, do_double, font=None, x=None, y=None, target=None):
+        """
+        Generic text rendering routine. Starts at the cursor unless x and y
+        are given, and draws into the display buffer unless target is a Bitmap
+        """
+        if font is None: font = self._default_font()
+        assert not do_double or font.height <= 8, "ERROR - text_2x() requires an 8-pixel font"
+        if x is None: x = self.x
+        if y is None: y = self.y
+        if target is None: target = self
+        blit_column = target._blit_column
+        width = target.width
+        height = target.height
+        space_size = 4 if do_double else 1
+        bit_max = font.height * (2 if do_double else 1)
+        column_bytes = font.column_bytes
+
+        for i in range(0, len(the_string)):
+            code = ord(the_string[i])
+            columns, start, glyph_len = font.glyph(code)
+            if do_double: table_2x, pairs = font.glyph_2x(code)
+
+            if do_wrap:
+                if x + glyph_len * (2 if do_double else 1) >= width:
+                    if y + bit_max < height:
+                        x = 0
+                        y += bit_max
+                    else:
+                        return self
+
+            for j in range(1, glyph_len + 1):
+                if do_double:
+                    # Each pair of adjacent glyph columns becomes four
+                    # double-height columns, overlapping the next pair's
+                    if j == glyph_len: break
+                    k = pairs + ((j - 1) << 2)
+                    if x < width: blit_column(x, y, table_2x[k])
+                    if x + 1 < width: blit_column(x + 1, y, table_2x[k + 1])
+                    if x + 2 < width: blit_column(x + 2, y, table_2x[k + 2])
+                    if x + 3 < width: blit_column(x + 3, y, table_2x[k + 3])
+                elif x < width:
+                    if column_bytes == 1:
+                        blit_column(x, y, columns[start + j - 1])
+                    else:
+                        blit_column(x, y, font.column(columns, start + (j - 1) * column_bytes))
+
+                x += (2 if do_double else 1)
+                if x >= width:
+                    if not do_wrap: return self
+                    if y + bit_max < height:
+                        x = 0
+                        y += bit_max
+                    else:
+                        break
+
+            # Add spacer if we can
+            if i < len(the_string) - 1:
+                x += space_size
+                if x >= width:
+                    if not do_wrap: return self
+                    if y + bit_max < height:
+                        x = 0
+                        y += bit_max
+                    else:
+                        break
+        return self
+
+    def _default_font(self):
+        """
+        Get the built-in character set as a Font. This is built on first
+        use and shared by all instances
+
+        Returns:
+            The character set (Font)
+        """
+        if SSD1306OLED._font is None:
+            SSD1306OLED._font = Font.from_charset(self.CHARSET)
+        return SSD1306OLED._font
+
+    def _blit_column(self, x, y, value):
+        """
+        OR a column of pixels into the buffer a byte at a time: bit 0 of
+        the value goes at (x, y), bit 1 at (x, y + 1), and so on. When y is
+        page-aligned each byte of the value lands in one buffer byte;
+        otherwise each byte is split across two pages. Pixels below the
+        bottom of the screen are dropped
+
+        Args:
+            x     (int) The X co-ordinate in the range 0 - 127
+            y     (int) The Y co-ordinate of the column's top pixel
+            value (int) The column's pixels
+        """
+        if x < 0: return
+        page = y >> 3
+        value <<= (y & 7)
+        index = page * self.width + x
+        while value and page < self.pages:
+            self.buffer[index] |= value & 0xFF
+            if x < self._dirty_lo[page]: self._dirty_lo[page] = x
+            if x > self._dirty_hi[page]: self._dirty_hi[page] = x
+            value >>= 8
+            page += 1
+            index += self.width
+
+    def _set_rst(self, is_on=True):
+        """
+        Select GPIO pin setting mechanism by Python type.
+
+        Args:
+            is_on (Bool) Are we toggling RST on?
+        """
+        if self.is_micropython:
+            if is_on:
+                self.rst.on()
+            else:
+                self.rst.off()
+        else:
+            self.rst.value = is_on
+
+
+class Font:
+    """
+    A proportionally spaced bitmap typeface for SSD1306OLED's text methods.
+
+    A font is kept in a compact binary format. The format can be used as-is from
+    memory, or read one glyph at a time from a file so that large fonts need not
+    be held in RAM:
+
+        Offset   Size     Content
+        0        4        b"SSDF"
+        4        1        Format version: 1
+        5        1        Glyph height in pixels
+        6        2        First character code
+        8        2        Number of glyphs, n
+        10       2n + 2   Column offsets: glyph i is columns offset[i] to offset[i + 1] - 1
+        12 + 2n  ...      Columns, (height + 7) // 8 bytes each, bit 0 the top pixel
+
+    All multi-byte values are little-endian
+    """
+
+    # *********** CONSTANTS **********
+
+    MAGIC = b"SSDF"
+    VERSION = 1
+    HEADER_SIZE = 10
+
+    # The number of text layouts each font keeps
+    LAYOUT_CACHE_SIZE = 16
+    # The number of text measurements each font keeps
+    MEASURE_CACHE_SIZE = 16
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, source):
+        """
+        Args:
+            source (bytes or file) The font data, or a binary file object (or mmap) to read it from
+        """
+        try:
+            self._data = memoryview(source)
+            self._file = None
+            header = self._data[:self.HEADER_SIZE]
+        except TypeError:
+            self._data = None
+            self._file = source
+            source.seek(0)
+            header = source.read(self.HEADER_SIZE)
+        assert bytes(header[:4]) == self.MAGIC and header[4] == self.VERSION, "ERROR - Unrecognised font data passed to Font()"
+        self.height = header[5]
+        self.first = header[6] | (header[7] << 8)
+        self.count = header[8] | (header[9] << 8)
+        self.column_bytes = (self.height + 7) >> 3
+        self._columns_start = self.HEADER_SIZE + (self.count + 1) * 2
+        self._table_2x = None
+        self._used_2x = 0
+        self._bases_2x = {}
+        self._widths = None
+        self._layouts = {}
+        self._measures = {}
+        self._cache_tick = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def load(path):
+        """
+        Open a font file. Glyphs are read from the file as they are needed,
+        so close() the font, or use it in a with statement, when done with it:
+
+            with Font.load("font.ssdf") as font:
+                display.text("Hello", font=font).draw()
+
+        Args:
+            path (string) The font file's path
+
+        Returns:
+            The font (Font)
+        """
+        return Font(open(path, "rb"))
+
+    @staticmethod
+    def from_charset(charset, first=32):
+        """
+        Create an 8-pixel font from a list of glyphs in the form of SSD1306OLED.CHARSET:
+        one bytes object per character, one byte per column, bit 7 the top pixel
+
+        Args:
+            charset (list) The glyphs
+            first   (int)  The character code of the first glyph. Default: 32
+
+        Returns:
+            The font (Font)
+        """
+        count = len(charset)
+        data = bytearray(Font.MAGIC)
+        data.extend(bytes([Font.VERSION, 8, first & 0xFF, first >> 8, count & 0xFF, count >> 8]))
+        offset = 0
+        for glyph in charset + [b""]:
+            data.append(offset & 0xFF)
+            data.append(offset >> 8)
+            offset += len(glyph)
+        for glyph in charset:
+            for col in glyph: data.append(Font._flip(col))
+        return Font(bytes(data))
+
+    # *********** PUBLIC METHODS **********
+
+    def close(self):
+        """
+        Close the file the font reads its glyphs from. A font held in memory is unaffected
+        """
+        if self._file is not None: self._file.close()
+
+    def to_bytes(self):
+        """
+        Get the font in its binary format, eg. to save to a file
+
+        Returns:
+            The font data (bytes)
+        """
+        if self._data is not None: return bytes(self._data)
+        self._file.seek(0)
+        return self._file.read()
+
+    def width(self, code):
+        """
+        Get the width of a character
+
+        Args:
+            code (int) The character code
+
+        Returns:
+            The width in pixels, or 0 if the font has no such character
+        """
+        index = code - self.first
+        if index < 0 or index >= self.count: return 0
+        if self._widths is None: self._load_widths()
+        return self._widths[index]
+
+    def layout(self, text, max_width=0):
+        """
+        Break text into lines and measure them. Lines break at newlines and,
+        if max_width is set, between words or, for words too long for a line,
+        between characters. The most recently used layouts are cached
+
+        Args:
+            text      (string) The text to lay out
+            max_width (int)    The width available in pixels, or 0 for no wrapping. Default: 0
+
+        Returns:
+            A tuple: the widest line's width in pixels, and a tuple of (line, width) tuples
+        """
+        self._cache_tick += 1
+        key = (text, max_width)
+        entry = self._layouts.get(key)
+        if entry is not None:
+            entry[0] = self._cache_tick
+            return entry[1]
+
+        lines = []
+        for paragraph in text.split("\n"):
+            self._wrap(paragraph, max_width, lines)
+        result = (max([width for line, width in lines]), tuple(lines))
+        self._remember(self._layouts, self.LAYOUT_CACHE_SIZE, key, result)
+        return result
+
+    def measure(self, text):
+        """
+        Measure text without wrapping. The most recently measured strings are
+        cached apart from layouts, so measuring text doesn't push labels out
+        of the layout cache
+
+        Args:
+            text (string) The text to measure
+
+        Returns:
+            The widest line's width in pixels
+        """
+        self._cache_tick += 1
+        entry = self._measures.get(text)
+        if entry is not None:
+            entry[0] = self._cache_tick
+            return entry[1]
+
+        if "\n" not in text:
+            result = self._run_width(text)
+        else:
+            result = max([self._run_width(line) for line in text.split("\n")])
+        self._remember(self._measures, self.MEASURE_CACHE_SIZE, text, result)
+        return result
+
+    def glyph(self, code):
+        """
+        Get a character's columns. For speed these are not copied from an
+        in-memory font: the columns are returned with the data they are in
+
+        Args:
+            code (int) The character code
+
+        Returns:
+            A tuple: the data (bytes-like), the index of the first column's first byte, and the number of columns
+        """
+        index = code - self.first
+        if index < 0 or index >= self.count: return (b"", 0, 0)
+        start, end = self._offsets(index)
+        if self._data is not None:
+            return (self._data, self._columns_start + start * self.column_bytes, end - start)
+        self._file.seek(self._columns_start + start * self.column_bytes)
+        return (self._file.read((end - start) * self.column_bytes), 0, end - start)
+
+    def column(self, data, index):
+        """
+        Read a multi-byte column from glyph data
+
+        Args:
+            data  (bytes) The glyph data, as returned by glyph()
+            index (int)   The index of the column's first byte
+
+        Returns:
+            The column's pixels, bit 0 the top pixel (int)
+        """
+        value = 0
+        for i in range(self.column_bytes):
+            value |= data[index + i] << (i << 3)
+        return value
+
+    def glyph_2x(self, code):
+        """
+        Get a character's double-size columns, converting the character on first use.
+        Each pair of adjacent columns becomes four 16-bit columns. The font keeps
+        them all in one array, which grows only as characters are converted
+
+        Args:
+            code (int) The character code
+
+        Returns:
+            A tuple: the array, and the index of the character's first column in it
+        """
+        index = code - self.first
+        if index < 0 or index >= self.count: return (self._table_2x, 0)
+        base = self._bases_2x.get(index)
+        if base is None:
+            data, start, width = self.glyph(code)
+            size = max(width - 1, 0) << 2
+            self._grow_2x(size)
+            table = self._table_2x
+            base = self._used_2x
+            self._used_2x += size
+            k = base
+            for i in range(start, start + width - 1):
+                col_0 = data[i]
+                col_1 = data[i + 1]
+                col_0_right = self._stretch(col_0)
+                col_0_left = col_0_right
+                col_1_right = self._stretch(col_1)
+                col_1_left = col_1_right
+
+                # Smooth diagonals where the columns meet
+                for a in range(6, -1, -1):
+                    for b in range(1, 3):
+                        if (col_0 >> a & 3 == 3 - b) and (col_1 >> a & 3 == b):
+                            col_0_right |= (1 << ((a * 2) + b))
+                            col_1_left |= (1 << ((a * 2) + 3 - b))
+
+                table[k] = col_0_left
+                table[k + 1] = col_0_right
+                table[k + 2] = col_1_left
+                table[k + 3] = col_1_right
+                k += 4
+            self._bases_2x[index] = base
+        return (self._table_2x, base)
+
+    def preload_2x(self, characters=None):
+        """
+        Convert characters to double size ahead of use
+
+        Args:
+            characters (string) The characters to convert. Default: all of them
+        """
+        if characters is None:
+            # Size the table for every character at once, rather than growing it for each
+            needed = 0
+            for index in range(self.count):
+                if index not in self._bases_2x: needed += max(self.width(self.first + index) - 1, 0) << 2
+            self._grow_2x(needed)
+            for code in range(self.first, self.first + self.count): self.glyph_2x(code)
+        else:
+            for char in characters: self.glyph_2x(ord(char))
+
+    # ********** PRIVATE METHODS **********
+
+    def _grow_2x(self, size):
+        """
+        Make room in the double-size table for size more columns
+        """
+        from array import array
+        if self._table_2x is None: self._table_2x = array("H")
+        short = self._used_2x + size - len(self._table_2x)
+        if short > 0: self._table_2x.extend(array("H", bytes(short << 1)))
+
+    def _remember(self, cache, size, key, value):
+        """
+        Add a value to a cache, evicting the least recently used entry if the cache is full
+        """
+        if len(cache) >= size:
+            oldest = None
+            for cached_key in cache:
+                if oldest is None or cache[cached_key][0] < cache[oldest][0]: oldest = cached_key
+            del cache[oldest]
+        cache[key] = [self._cache_tick, value]
+
+    def _wrap(self, text, max_width, lines):
+        """
+        Break a paragraph into lines no wider than max_width, if it is
+        not zero, and add them to lines as (line, width) tuples
+        """
+        line = ""
+        line_width = 0
+        started = False
+        space = self.width(32)
+        for word in text.split(" "):
+            word_width = self._run_width(word)
+            joined_width = line_width + (1 if len(line) > 0 else 0) + space + (word_width + 1 if len(word) > 0 else 0)
+            if started and (max_width == 0 or joined_width <= max_width):
+                line += " " + word
+                line_width = joined_width
+                continue
+            if started: lines.append((line, line_width))
+
+            # Start a new line with the word, splitting it if it's too long
+            while max_width > 0 and word_width > max_width and len(word) > 1:
+                cut = 1
+                cut_width = self.width(ord(word[0]))
+                while cut < len(word) and cut_width + 1 + self.width(ord(word[cut])) <= max_width:
+                    cut_width += 1 + self.width(ord(word[cut]))
+                    cut += 1
+                lines.append((word[:cut], cut_width))
+                word = word[cut:]
+                word_width = self._run_width(word)
+            line = word
+            line_width = word_width
+            started = True
+        lines.append((line, line_width))
+
+    def _run_width(self, text):
+        """
+        Measure a run of text without wrapping
+        """
+        if len(text) == 0: return 0
+        if self._widths is None: self._load_widths()
+        widths = self._widths
+        first = self.first
+        count = self.count
+        width = len(text) - 1
+        for char in text:
+            index = ord(char) - first
+            if 0 <= index < count: width += widths[index]
+        return width
+
+    def _load_widths(self):
+        """
+        Read every glyph's width into a table, so text can be measured without reading the offsets
+        """
+        widths = bytearray(self.count)
+        for index in range(self.count):
+            start, end = self._offsets(index)
+            widths[index] = end - start
+        self._widths = widths
+
+    def _offsets(self, index):
+        """
+        Read a glyph's start and end column offsets
+        """
+        position = self.HEADER_SIZE + (index << 1)
+        if self._data is not None:
+            data = self._data
+            return (data[position] | (data[position + 1] << 8), data[position + 2] | (data[position + 3] << 8))
+        self._file.seek(position)
+        data = self._file.read(4)
+        return (data[0] | (data[1] << 8), data[2] | (data[3] << 8))
+
+    @staticmethod
+    def _flip(value):
+        """
+        Rotates the character array from the saved state
+        to that required by the screen orientation
+        """
+        flipped = 0
+        for i in range (0, 8):
+            if (value & (1 << i)) > 0:
+                flipped += (1 << (7 - i))
+        return flipped
+
+    @staticmethod
+    def _stretch(x):
+        """
+        Pixel-doubles an 8-bit value to 16 bits
+        """
+        x = (x & 0xF0) << 4 | (x & 0x0F)
+        x = (x << 2 | x) & 0x3333
+        x = (x << 1 | x) & 0x5555
+        x = x | x << 1
+        return x
+
+
+class Bitmap:
+    """
+    A monochrome image for SSD1306OLED.blit(), stored in the same layout as the
+    display buffer: rows are grouped into 8-pixel pages, each page is one byte
+    per column, and bit 0 of each byte is the page's top pixel
+    """
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, width, height, data=None):
+        """
+        Args:
+            width  (int)   The width in pixels
+            height (int)   The height in pixels
+            data   (bytes) The image in page layout. Default: a blank image
+        """
+        assert width > 0 and height > 0, "ERROR - Invalid size passed to Bitmap()"
+        self.width = width
+        self.height = height
+        self.pages = (height + 7) >> 3
+        if data is None:
+            self.buffer = bytearray(width * self.pages)
+        else:
+            assert len(data) == width * self.pages, "ERROR - Data of the wrong size passed to Bitmap()"
+            self.buffer = data
+
+    # *********** PUBLIC METHODS **********
+
+    def get_pixel(self, x, y):
+        """
+        Get the pixel at the specified co-ordinates
+
+        Args:
+            x (int) The X co-ordinate
+            y (int) The Y co-ordinate
+
+        Returns:
+            1 if the pixel is set, otherwise 0
+        """
+        assert (0 <= x < self.width) and (0 <= y < self.height), "ERROR - Out-of-range co-ordinate(s) passed to get_pixel()"
+        return (self.buffer[(y >> 3) * self.width + x] >> (y & 7)) & 1
+
+    # ********** PRIVATE METHODS **********
+
+    def _blit_column(self, x, y, value):
+        """
+        OR a column of pixels into the image, as SSD1306OLED._blit_column() does for the display
+        """
+        if x < 0 or x >= self.width: return
+        page = y >> 3
+        value <<= (y & 7)
+        index = page * self.width + x
+        while value and page < self.pages:
+            self.buffer[index] |= value & 0xFF
+            value >>= 8
+            page += 1
+            index += self.width
+
+
+class FrameCodec:
+    """
+    Compresses display buffer frames for storage and decodes them straight into a
+    buffer, with no intermediate copy.
+
+    An encoded frame is a type byte, KEY or DELTA, followed by run-length coded
+    data. A KEY frame's data is the frame itself; a DELTA frame's is the frame
+    XORed with the one before, so unchanged bytes are zero. The data is a series
+    of runs, each starting with a control byte c:
+
+        0x00-0x7F   c + 1 literal bytes follow
+        0x80-0xFF   the next byte is repeated (c & 0x7F) + 1 times
+    """
+
+    # *********** CONSTANTS **********
+
+    KEY = 0x4B
+    DELTA = 0x44
+
+    # Preallocated runs of the commonest repeated bytes, for fast key frame decoding
+    _ZEROS = memoryview(bytes(128))
+    _ONES = memoryview(bytes([0xFF]) * 128)
+
+    # *********** PUBLIC METHODS **********
+
+    @staticmethod
+    def encode(frame, previous=None):
+        """
+        Encode a frame, as a delta of the previous frame if one is given and
+        that is smaller
+
+        Args:
+            frame    (bytes) The frame, in display buffer layout
+            previous (bytes) The frame before it. Default: None
+
+        Returns:
+            The encoded frame (bytes)
+        """
+        key = FrameCodec._pack(FrameCodec.KEY, frame)
+        if previous is None: return key
+        assert len(previous) == len(frame), "ERROR - Frames of different sizes passed to FrameCodec.encode()"
+        delta = FrameCodec._pack(FrameCodec.DELTA, bytes([a ^ b for a, b in zip(frame, previous)]))
+        return delta if len(delta) < len(key) else key
+
+    @staticmethod
+    def encode_all(frames):
+        """
+        Encode a sequence of frames, each but the first as a delta where that is smaller
+
+        Args:
+            frames (iterable) The frames
+
+        Returns:
+            The encoded frames (list)
+        """
+        encoded = []
+        previous = None
+        for frame in frames:
+            encoded.append(FrameCodec.encode(frame, previous))
+            previous = frame
+        return encoded
+
+    @staticmethod
+    def decode(data, buffer, changed=None):
+        """
+        Decode a frame into a buffer in place. A delta frame is applied to the
+        buffer's current contents
+
+        Args:
+            data    (bytes)    The encoded frame
+            buffer  (bytes)    The buffer to decode into, eg. SSD1306OLED.buffer
+            changed (function) Called with the start and end indexes of each run of changed bytes. Default: None
+        """
+        data = memoryview(data)
+        delta = data[0] == FrameCodec.DELTA
+        assert delta or data[0] == FrameCodec.KEY, "ERROR - Unrecognised frame passed to FrameCodec.decode()"
+        i = 1
+        position = 0
+        size = len(data)
+        while i < size:
+            control = data[i]
+            if control & 0x80:
+                count = (control & 0x7F) + 1
+                value = data[i + 1]
+                i += 2
+                if delta:
+                    if value == 0:
+                        # No change
+                        position += count
+                        continue
+                    for j in range(position, position + count): buffer[j] ^= value
+                elif value == 0:
+                    buffer[position:position + count] = FrameCodec._ZEROS[:count]
+                elif value == 0xFF:
+                    buffer[position:position + count] = FrameCodec._ONES[:count]
+                else:
+                    for j in range(position, position + count): buffer[j] = value
+            else:
+                count = control + 1
+                i += 1
+                if delta:
+                    for j in range(count): buffer[position + j] ^= data[i + j]
+                else:
+                    buffer[position:position + count] = data[i:i + count]
+                i += count
+            if changed is not None and delta: changed(position, position + count)
+            position += count
+        if changed is not None and not delta: changed(0, position)
+
+    # ********** PRIVATE METHODS **********
+
+    @staticmethod
+    def _pack(kind, data):
+        """
+        Run-length code data: runs of three or more identical bytes are
+        repeats, everything else is literals
+        """
+        output = bytearray([kind])
+        size = len(data)
+        i = 0
+        literal = 0
+        while i < size:
+            run = 1
+            while i + run < size and run < 128 and data[i + run] == data[i]: run += 1
+            if run >= 3:
+                FrameCodec._flush(output, data, literal, i)
+                output.append(0x80 | (run - 1))
+                output.append(data[i])
+                i += run
+                literal = i
+            else:
+                i += run
+                if i - literal >= 128:
+                    FrameCodec._flush(output, data, literal, literal + 128)
+                    literal += 128
+        FrameCodec._flush(output, data, literal, size)
+        return bytes(output)
+
+    @staticmethod
+    def _flush(output, data, start, end):
+        """
+        Append literal runs for data[start:end]
+        """
+        while start < end:
+            count = min(end - start, 128)
+            output.append(count - 1)
+            output.extend(data[start:start + count])
+            start += count
+
+
+class FrameScheduler:
+    """
+    Runs an animation at a steady frame rate as an asyncio task, drawing each
+    frame with draw_async() so that other tasks keep running.
+
+    Frames are numbered from 0 and are due at fixed times after the start, so
+    pacing doesn't drift. When a frame overruns into the next frame's slot,
+    the frames whose slots have passed are skipped: they are not rendered, and
+    are counted in frames_skipped. Frame numbers, and so animations based on
+    them, keep time.
+    """
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, display, fps=10):
+        assert fps > 0, "ERROR - FrameScheduler() requires a positive frame rate"
+        self.display = display
+        self.fps = fps
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+        self.running = False
+
+    # *********** PUBLIC METHODS **********
+
+    async def run(self, render, frames=None):
+        """
+        Render and draw frames until stop() is called
+
+        Args:
+            render (function) Called as render(display, frame) to draw a frame into the display buffer.
+                              It may be a coroutine function
+            frames (int)      Stop after this many frame numbers, drawn or skipped. Default: run until stopped
+
+        Returns:
+            The instance (self)
+        """
+        asyncio = self.display._asyncio()
+        ticks_ms, ticks_diff = self.display._clock()
+        fps = self.fps
+        frame = 0
+        start = ticks_ms()
+        self.running = True
+        while self.running and (frames is None or frame < frames):
+            result = render(self.display, frame)
+            # MicroPython coroutines are generators, with no __await__()
+            if hasattr(result, "__await__") or hasattr(result, "send"): await result
+            await self.display.draw_async()
+            self.frames_drawn += 1
+
+            frame += 1
+            elapsed = ticks_diff(ticks_ms(), start)
+            wait = frame * 1000 // fps - elapsed
+            if wait > 0:
+                await asyncio.sleep(wait / 1000)
+            else:
+                # Running late: skip to the last frame that is already due
+                missed = ((elapsed + 1) * fps - 1) // 1000 - frame
+                if frames is not None: missed = min(missed, frames - frame)
+                frame += missed
+                self.frames_skipped += missed
+                await asyncio.sleep(0)
+        self.running = False
+        return self
+
+    def stop(self):
+        """
+        Stop the animation after the current frame
+
+        Returns:
+            The instance (self)
+        """
+        self.running = False
+        return self
+
+
+class DisplayGroup:
+    """
+    Drives several displays as one tiled canvas, eg. two panels per bus, at
+    addresses 0x3C and 0x3D, across several buses.
+
+    Draw on the group's canvas, an off-screen SSD1306OLED as wide and tall as
+    the tiles together, then call the group's draw(). Each panel is sent only
+    the changed areas of its own tile. The panels on a bus are sent in turn,
+    a page at a time each, so they update together, and the buses are sent
+    one after another. On CPython, ThreadedDisplayGroup, in ssd1306_threaded.py,
+    sends the buses in parallel instead.
+
+    Each panel is given as a tuple:
+
+        (reset_pin, i2c, address, width, height, x, y)
+
+    where x and y place the panel's top left corner on the canvas. y must be
+    a multiple of 8. The group resets all the panels together, so panels may
+    share a reset pin, then initialises and clears them all, as it sends a frame.
+    """
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, panels, max_transfer=None):
+        import time
+        assert len(panels) > 0, "ERROR - DisplayGroup() requires at least one panel"
+        for panel in panels:
+            assert panel[5] >= 0 and panel[6] >= 0 and panel[6] & 7 == 0, "ERROR - Invalid panel position passed to DisplayGroup()"
+
+        # Toggle every distinct RST pin at once, over 1ms + 10ms
+        pins = []
+        for panel in panels:
+            if panel[0] is not None and not any(pin is panel[0] for pin in pins): pins.append(panel[0])
+        for is_on, delay in ((True, 0.001), (False, 0.01), (True, 0)):
+            for pin in pins: self._set_pin(pin, is_on)
+            if delay: time.sleep(delay)
+
+        self.tiles = []
+        self.displays = []
+        self._buses = []
+        for reset_pin, i2c, address, width, height, x, y in panels:
+            display = SSD1306OLED(reset_pin, i2c, address, width, height, max_transfer, do_reset=False, do_init=False)
+            self.tiles.append((display, x, y))
+            self.displays.append(display)
+            # Group the displays by the bus they share
+            for bus in self._buses:
+                if bus[0].i2c is i2c:
+                    bus.append(display)
+                    break
+            else:
+                self._buses.append([display])
+
+        self.canvas = SSD1306OLED(None, None, 0x3C,
+                                  max(x + display.width for display, x, y in self.tiles),
+                                  max(y + display.height for display, x, y in self.tiles))
+
+        # Initialise the panels together, then count from here
+        self.reset_stats()
+        self._send(True, True)
+        self.reset_stats()
+
+    # *********** PUBLIC METHODS **********
+
+    def draw(self, full=False):
+        """
+        Send the canvas's changed areas to the panels
+
+        Args:
+            full (bool) Send every panel's whole buffer. Default: False
+
+        Returns:
+            The instance (self)
+        """
+        self._distribute(full)
+        self._send(full)
+        self.frames += 1
+        return self
+
+    async def draw_async(self, full=False):
+        """
+        Send the canvas's changed areas to the panels like draw(), but as
+        one asyncio task per bus, yielding after each page sent
+
+        Args:
+            full (bool) Send every panel's whole buffer. Default: False
+        """
+        asyncio = SSD1306OLED._asyncio()
+        self._distribute(full)
+
+        async def send(bus):
+            steps = self._bus_steps(bus, full)
+            try:
+                for _ in steps: await asyncio.sleep(0)
+            finally:
+                # On cancellation, put back the areas not sent
+                steps.close()
+
+        await asyncio.gather(*[send(bus) for bus in range(len(self._buses))])
+        self.frames += 1
+
+    def close(self):
+        """
+        Release the group. This does nothing here, but stops a ThreadedDisplayGroup's workers
+
+        Returns:
+            The instance (self)
+        """
+        return self
+
+    def stats(self):
+        """
+        Report the group's performance since the last reset_stats()
+
+        Returns:
+            A dict: "frames" drawn, "fps", and "bus_use", the fraction of the
+            time each bus spent sending, in the order the buses were first given
+        """
+        seconds = max(self._ticks_diff(self._ticks(), self._started), 1) / 1000000
+        return {"frames": self.frames,
+                "fps": self.frames / seconds,
+                "bus_use": [busy / 1000000 / seconds for busy in self._busy]}
+
+    def reset_stats(self):
+        """
+        Zero the group's frame count and bus timings
+
+        Returns:
+            The instance (self)
+        """
+        self._ticks, self._ticks_diff = SSD1306OLED._clock(True)
+        self._started = self._ticks()
+        self._busy = [0] * len(self._buses)
+        self.frames = 0
+        return self
+
+    # ********** PRIVATE METHODS **********
+
+    def _distribute(self, full):
+        """
+        Copy the canvas's changed areas into the buffers of the panels they fall on
+
+        Args:
+            full (bool) Copy the whole canvas
+        """
+        canvas = self.canvas
+        if full: canvas._mark_dirty(0, 0, canvas.width - 1, canvas.height - 1)
+        lo = canvas._dirty_lo
+        hi = canvas._dirty_hi
+        for display, x, y in self.tiles:
+            width = display.width
+            for page in range(display.pages):
+                canvas_page = (y >> 3) + page
+                start = max(lo[canvas_page], x)
+                end = min(hi[canvas_page], x + width - 1)
+                if start > end: continue
+                source = canvas_page * canvas.width
+                target = page * width - x
+                display.buffer[target + start:target + end + 1] = canvas.buffer[source + start:source + end + 1]
+                if start - x < display._dirty_lo[page]: display._dirty_lo[page] = start - x
+                if end - x > display._dirty_hi[page]: display._dirty_hi[page] = end - x
+        canvas._clear_dirty()
+
+    def _send(self, full, init=False):
+        """
+        Send the changed areas of every panel, a bus at a time
+
+        Args:
+            full (bool) Send each panel's whole buffer
+            init (bool) Set up and clear the panels instead. Default: False
+        """
+        for bus in range(len(self._buses)):
+            for _ in self._bus_steps(bus, full, init): pass
+
+    def _bus_steps(self, bus, full, init=False):
+        """
+        Send the changed areas of a bus's panels, a page from each in turn
+
+        Args:
+            bus  (int)  The index of the bus
+            full (bool) Send each panel's whole buffer
+            init (bool) Set up and clear the panels instead. Default: False
+
+        Yields:
+            None, after each transaction sent
+        """
+        ticks = self._ticks
+        ticks_diff = self._ticks_diff
+        steps = [display._init_steps() if init else display._draw_steps(full) for display in self._buses[bus]]
+        try:
+            while steps:
+                for step in list(steps):
+                    started = ticks()
+                    try:
+                        next(step)
+                    except StopIteration:
+                        steps.remove(step)
+                    self._busy[bus] += ticks_diff(ticks(), started)
+                    yield
+        finally:
+            # Abandoned: have each panel put back the areas it didn't send
+            for step in steps: step.close()
+
+    @staticmethod
+    def _set_pin(pin, is_on):
+        """
+        Set a MicroPython Pin or CircuitPython DigitalInOut
+
+        Args:
+            pin   (object) The pin
+            is_on (bool)   Set it high (True) or low (False)
+        """
+        if hasattr(pin, "on"):
+            if is_on:
+                pin.on()
+            else:
+                pin.off()
+        else:
+            pin.value = is_on
@@ -0,0 +1,373 @@
+class EmulatedSSD1306:
+    """
+    A software model of the Solomon SSD1306 controller, for running the driver
+    with no hardware: in CI, in benchmarks, or to preview output on a computer.
+
+    It parses the command and data bytes the driver sends, keeps the
+    controller's 128 x 64 GDDRAM, and renders what the panel would show,
+    allowing for inversion, display on/off, start line, re-mapping and
+    hardware scrolling. Attach it to an EmulatedBus, and pass the bus and
+    the model's reset_pin to SSD1306OLED:
+
+        bus = EmulatedBus(400000)
+        panel = bus.add(EmulatedSSD1306(128, 32), 0x3C)
+        display = SSD1306OLED(panel.reset_pin, bus, 0x3C, 128, 32)
+        display.text("Hello").draw()
+        open("hello.pbm", "wb").write(panel.to_pbm())
+
+    Version:   2.1.0
+    Author:    smittytone
+    Copyright: 2022, Tony Smith
+    Licence:   MIT
+    """
+
+    # *********** CONSTANTS **********
+
+    RAM_COLUMNS = 128
+    RAM_PAGES = 8
+
+    # The number of parameter bytes that follow each multi-byte command
+    PARAMETERS = {0x20: 1, 0x21: 2, 0x22: 2, 0x26: 6, 0x27: 6, 0x29: 5, 0x2A: 5,
+                  0x81: 1, 0x8D: 1, 0xA3: 2, 0xA8: 1, 0xD3: 1, 0xD5: 1, 0xD9: 1,
+                  0xDA: 1, 0xDB: 1}
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, width=128, height=32):
+        assert 0 < width <= self.RAM_COLUMNS and 0 < height <= self.RAM_PAGES * 8, "ERROR - Invalid size passed to EmulatedSSD1306()"
+        self.width = width
+        self.height = height
+        self.ram = bytearray(self.RAM_COLUMNS * self.RAM_PAGES)
+        self.reset_pin = EmulatedPin(self)
+
+        # Counters, zeroed by reset_stats()
+        self.commands = 0
+        self.data_bytes = 0
+        self.writes_while_scrolling = 0
+        self.unknown_commands = []
+        self.reset()
+
+    # *********** PUBLIC METHODS **********
+
+    def reset(self):
+        """
+        Return the controller's registers to their power-on values, as the RST
+        pin does. Like the real chip, the GDDRAM keeps its contents
+        """
+        self.is_on = False
+        self.is_inverse = False
+        self.is_all_on = False
+        self.contrast = 0x7F
+        self.memory_mode = 2
+        self.col_start = 0
+        self.col_end = self.RAM_COLUMNS - 1
+        self.page_start = 0
+        self.page_end = self.RAM_PAGES - 1
+        self.col = 0
+        self.page = 0
+        self.start_line = 0
+        self.offset = 0
+        self.multiplex = 63
+        self.is_seg_remapped = False
+        self.is_com_reversed = False
+        self.is_scrolling = False
+        self.scroll = None
+        self.scroll_area = (0, 64)
+        self._vertical = 0
+        self._command = []
+
+    def receive(self, buffer):
+        """
+        Process one I2C transaction's bytes, after the address
+
+        Args:
+            buffer (bytes) The control and command or data bytes
+        """
+        i = 0
+        while i < len(buffer):
+            control = buffer[i]
+            i += 1
+            if control & 0x80:
+                # Co set: one byte, then another control byte
+                if i < len(buffer): self._accept(buffer[i:i + 1], control & 0x40)
+                i += 1
+            else:
+                self._accept(buffer[i:], control & 0x40)
+                break
+
+    def step(self, steps=1):
+        """
+        Advance an active scroll, as the controller does every interval
+
+        Args:
+            steps (int) The number of scroll steps. Default: 1
+        """
+        if not self.is_scrolling: return
+        kind, start_page, end_page, rows = self.scroll
+        for _ in range(steps):
+            for page in range(start_page, end_page + 1):
+                row = page * self.RAM_COLUMNS
+                data = self.ram[row:row + self.RAM_COLUMNS]
+                if kind in (0x26, 0x29):
+                    self.ram[row:row + self.RAM_COLUMNS] = data[-1:] + data[:-1]
+                else:
+                    self.ram[row:row + self.RAM_COLUMNS] = data[1:] + data[:1]
+            self._vertical += rows
+
+    def pixel(self, x, y):
+        """
+        Get a pixel as the panel shows it
+
+        Args:
+            x (int) The pixel's X co-ordinate
+            y (int) The pixel's Y co-ordinate
+
+        Returns:
+            1 if the pixel is lit, otherwise 0
+        """
+        if not self.is_on: return 0
+        if self.is_all_on: return 1
+        row = self._ram_row(y)
+        column = self.RAM_COLUMNS - 1 - x if not self.is_seg_remapped else x
+        lit = (self.ram[(row >> 3) * self.RAM_COLUMNS + column] >> (row & 7)) & 1
+        return lit ^ 1 if self.is_inverse else lit
+
+    def to_pbm(self):
+        """
+        Render what the panel shows as a binary PBM image. Lit pixels are white
+
+        Returns:
+            The image file's bytes
+        """
+        stride = (self.width + 7) >> 3
+        image = bytearray(("P4\n%i %i\n" % (self.width, self.height)).encode())
+        for y in range(self.height):
+            row = bytearray(stride)
+            for x in range(self.width):
+                # PBM's set bits are black
+                if not self.pixel(x, y): row[x >> 3] |= 0x80 >> (x & 7)
+            image.extend(row)
+        return bytes(image)
+
+    def reset_stats(self):
+        """
+        Zero the command and data counters
+        """
+        self.commands = 0
+        self.data_bytes = 0
+        self.writes_while_scrolling = 0
+        self.unknown_commands = []
+
+    # ********** PRIVATE METHODS **********
+
+    def _accept(self, data, is_data):
+        """
+        Handle a run of command or data bytes
+
+        Args:
+            data    (bytes) The bytes
+            is_data (bool)  Are they GDDRAM data (True) or commands (False)
+        """
+        if is_data:
+            self.data_bytes += len(data)
+            if self.is_scrolling: self.writes_while_scrolling += 1
+            for value in data: self._write(value)
+            return
+        # Commands may be split across transactions, so gather parameters as they come
+        for value in data:
+            self._command.append(value)
+            if len(self._command) > self.PARAMETERS.get(self._command[0], 0):
+                self._execute(self._command)
+                self._command = []
+
+    def _write(self, value):
+        """
+        Write a byte to GDDRAM and advance the address pointer
+        as the current memory addressing mode dictates
+
+        Args:
+            value (int) The byte
+        """
+        self.ram[self.page * self.RAM_COLUMNS + self.col] = value
+        if self.memory_mode == 0:
+            # Horizontal: along the page, then on to the next
+            self.col += 1
+            if self.col > self.col_end:
+                self.col = self.col_start
+                self.page = self.page_start if self.page >= self.page_end else self.page + 1
+        elif self.memory_mode == 1:
+            # Vertical: down the column, then on to the next
+            self.page += 1
+            if self.page > self.page_end:
+                self.page = self.page_start
+                self.col = self.col_start if self.col >= self.col_end else self.col + 1
+        else:
+            # Page: along the page, wrapping round it
+            self.col = (self.col + 1) % self.RAM_COLUMNS
+
+    def _execute(self, command):
+        """
+        Act on a complete command
+
+        Args:
+            command (list) The command byte and its parameters
+        """
+        self.commands += 1
+        code = command[0]
+        if code == 0x20:
+            self.memory_mode = command[1] & 0x03
+        elif code == 0x21:
+            self.col_start = command[1] & 0x7F
+            self.col_end = command[2] & 0x7F
+            self.col = self.col_start
+        elif code == 0x22:
+            self.page_start = command[1] & 0x07
+            self.page_end = command[2] & 0x07
+            self.page = self.page_start
+        elif code < 0x10:
+            self.col = (self.col & 0xF0) | code
+        elif code < 0x20:
+            self.col = (self.col & 0x0F) | ((code & 0x07) << 4)
+        elif code in (0x26, 0x27):
+            self.scroll = (code, command[2] & 0x07, command[4] & 0x07, 0)
+        elif code in (0x29, 0x2A):
+            self.scroll = (code, command[2] & 0x07, command[4] & 0x07, command[5] & 0x3F)
+        elif code == 0x2E:
+            self.is_scrolling = False
+        elif code == 0x2F:
+            self.is_scrolling = self.scroll is not None
+            self._vertical = 0
+        elif 0x40 <= code < 0x80:
+            self.start_line = code & 0x3F
+            self._vertical = 0
+        elif code == 0x81:
+            self.contrast = command[1]
+        elif code == 0x8D:
+            pass
+        elif code == 0xA3:
+            self.scroll_area = (command[1] & 0x3F, command[2] & 0x7F)
+        elif code in (0xA0, 0xA1):
+            self.is_seg_remapped = code == 0xA1
+        elif code in (0xA4, 0xA5):
+            self.is_all_on = code == 0xA5
+        elif code in (0xA6, 0xA7):
+            self.is_inverse = code == 0xA7
+        elif code == 0xA8:
+            self.multiplex = command[1] & 0x3F
+        elif code in (0xAE, 0xAF):
+            self.is_on = code == 0xAF
+        elif 0xB0 <= code < 0xB8:
+            self.page = code & 0x07
+        elif code in (0xC0, 0xC8):
+            self.is_com_reversed = code == 0xC8
+        elif code == 0xD3:
+            self.offset = command[1] & 0x3F
+        elif code in (0xD5, 0xD9, 0xDA, 0xDB, 0xE3):
+            pass
+        else:
+            self.unknown_commands.append(code)
+
+    def _ram_row(self, y):
+        """
+        Find the GDDRAM row shown on a panel row
+
+        Args:
+            y (int) The panel row
+
+        Returns:
+            The GDDRAM row
+        """
+        rows = self.multiplex + 1
+        com = y if self.is_com_reversed else rows - 1 - y
+        row = (com + self.start_line + self.offset) & 0x3F
+        # Vertical scrolling moves the rows inside the scroll area
+        top, count = self.scroll_area
+        if self._vertical and top <= row < top + count:
+            row = top + (row - top + self._vertical) % count
+        return row
+
+
+class EmulatedBus:
+    """
+    A software I2C bus for EmulatedSSD1306 controllers. It delivers each
+    transaction to the controller at its address, and totals the time the
+    transactions would take: a start condition, nine clocks per byte,
+    address included, a stop condition, and a fixed per-transaction
+    overhead for the host's driver
+    """
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, frequency=400000, overhead_us=0):
+        assert frequency > 0, "ERROR - Invalid frequency passed to EmulatedBus()"
+        self.frequency = frequency
+        self.overhead_us = overhead_us
+        self.devices = {}
+        self.reset_stats()
+
+    # *********** PUBLIC METHODS **********
+
+    def add(self, device, address=0x3C):
+        """
+        Attach a controller to the bus
+
+        Args:
+            device  (EmulatedSSD1306) The controller
+            address (int)             Its I2C address. Default: 0x3C
+
+        Returns:
+            The controller
+        """
+        self.devices[address] = device
+        return device
+
+    def writeto(self, address, buffer):
+        """
+        Send a transaction, as machine.I2C and busio.I2C do
+
+        Args:
+            address (int)    The target's I2C address
+            buffer  (buffer) The bytes to send
+        """
+        if address not in self.devices: raise OSError(19)
+        self.transactions += 1
+        self.bytes_sent += len(buffer)
+        self.bus_us += self.overhead_us + (2 + 9 * (len(buffer) + 1)) * 1000000 / self.frequency
+        self.devices[address].receive(bytes(buffer))
+
+    def reset_stats(self):
+        """
+        Zero the transaction, byte and time totals
+        """
+        self.transactions = 0
+        self.bytes_sent = 0
+        self.bus_us = 0
+
+    def stats(self):
+        """
+        Report the bus traffic since the last reset_stats()
+
+        Returns:
+            A dict of "transactions", "bytes" and simulated "bus_us"
+        """
+        return {"transactions": self.transactions, "bytes": self.bytes_sent, "bus_us": self.bus_us}
+
+
+class EmulatedPin:
+    """
+    A reset pin for an EmulatedSSD1306, usable as a CircuitPython DigitalInOut.
+    Taking it low resets the controller
+    """
+
+    def __init__(self, device):
+        self._device = device
+        self._value = True
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, is_on):
+        if self._value and not is_on: self._device.reset()
+        self._value = is_on
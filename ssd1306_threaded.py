@@ -0,0 +1,339 @@
+import copy
+import threading
+
+from ssd1306 import DisplayGroup
+
+
+class ThreadedRenderer:
+    """
+    Sends a display's buffer from a background thread, so that draw() returns
+    at once. For CPython hosts, eg. a Raspberry Pi running Blinka: it lives
+    in this module, not ssd1306.py, so that boards needn't compile it.
+
+    The renderer owns the I2C bus: once it is attached, call its draw() rather
+    than the display's. Frames pass through three buffers. The app draws into
+    the display's buffer. draw() copies the changed areas to a pending buffer,
+    and the worker thread copies them from there to the buffer it sends. So the
+    app can draw frame N + 1 while frame N is on the bus. If the app draws
+    faster than the bus can carry the frames, pending frames are merged and
+    only the latest is sent.
+
+    The display's own writes, eg. from set_inverse(), send_commands() or the
+    scroll methods, go through the renderer. They wait until the frames
+    already queued have been sent, then go out with the lock held, so they
+    never interleave with the worker's.
+
+    Version:   2.1.0
+    Author:    smittytone
+    Copyright: 2022, Tony Smith
+    Licence:   MIT
+    """
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, display):
+        self.display = display
+        self.frames_submitted = 0
+        self.frames_sent = 0
+        self.frames_coalesced = 0
+        self.error = None
+
+        # The pending frame, and the areas of it not yet taken by the worker
+        self._pending = bytearray(len(display.buffer))
+        self._pending_lo = [display.width] * display.pages
+        self._pending_hi = [-1] * display.pages
+        self._pending_full = False
+        self._queued = False
+        self._busy = False
+
+        # The worker's view of the display: the same bus and settings,
+        # but its own buffer, dirty areas and frame diffing shadow
+        front = copy.copy(display)
+        front._tx = bytearray(display._tx)
+        front._tx_view = memoryview(front._tx)
+        front.buffer = front._tx_view[1:]
+        front._window = bytearray(display._window)
+        front._runs = bytearray(display._runs)
+        front._dirty_lo = [display.width] * display.pages
+        front._dirty_hi = [-1] * display.pages
+        front._shadow = None
+        front.set_frame_diff(display._shadow is not None)
+        # Measure the app's drawing, not the worker's sending
+        if front._profile is not None: front.set_profiling(False)
+        display.set_frame_diff(False)
+        self._front = front
+        # The display writes through the renderer from now on: see writeto()
+        display.i2c = self
+
+        self._running = True
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._work, name="ssd1306-render")
+        self._thread.daemon = True
+        self._thread.start()
+
+    # *********** PUBLIC METHODS **********
+
+    def draw(self, full=False):
+        """
+        Queue the display buffer's changed areas to be sent, and return at once
+
+        Args:
+            full (bool) Send the whole buffer, eg. after writing to it directly. Default: False
+
+        Returns:
+            The instance (self)
+        """
+        display = self.display
+        # Stop any scroll, through writeto(), before the frame goes
+        if display.is_scrolling: full = display._end_scroll()
+        with self._condition:
+            self._raise_error()
+            assert self._running, "ERROR - ThreadedRenderer.draw() called after close()"
+            if full:
+                display._mark_dirty(0, 0, display.width - 1, display.height - 1)
+                self._pending_full = True
+            if self._queued: self.frames_coalesced += 1
+            self._hand_over(display.buffer, display._dirty_lo, display._dirty_hi,
+                            self._pending, self._pending_lo, self._pending_hi)
+            self.frames_submitted += 1
+            self._queued = True
+            self._condition.notify_all()
+        return self
+
+    def wait(self, timeout=None):
+        """
+        Wait until every queued frame has been sent
+
+        Args:
+            timeout (float) The longest time to wait, in seconds. Default: no limit
+
+        Returns:
+            Whether the frames have been sent
+        """
+        with self._condition:
+            done = self._condition.wait_for(lambda: not (self._queued or self._busy) or self.error is not None, timeout)
+            self._raise_error()
+            return done
+
+    def flush(self, timeout=None):
+        """
+        Queue the display buffer's changed areas and wait until they have been sent
+
+        Args:
+            timeout (float) The longest time to wait, in seconds. Default: no limit
+
+        Returns:
+            Whether the frames have been sent
+        """
+        return self.draw().wait(timeout)
+
+    def writeto(self, address, buffer):
+        """
+        Send one of the display's own writes, as the bus the display writes to.
+        Waits until the frames already queued have been sent, then writes with
+        the lock held, so the write can't interleave with the worker's
+
+        Args:
+            address (int)    The target's I2C address
+            buffer  (buffer) The bytes to send
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not (self._queued or self._busy) or self.error is not None)
+            self._raise_error()
+            front = self._front
+            front.i2c.writeto(address, buffer)
+            # Data, eg. from the display's own draw(), or a scroll changes the
+            # panel's RAM behind the worker's back: catch the worker up
+            if buffer[0] == self.display.SSD1306_WRITETOBUFFER:
+                front.buffer[:] = self.display.buffer
+                front._shadow_stale = True
+            elif self.display.SSD1306_ACTIVATE_SCROLL in buffer:
+                front._shadow_stale = True
+
+    def close(self):
+        """
+        Send any queued frames, then stop the worker thread and hand the bus back to the display
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+        self.display.i2c = self._front.i2c
+        # Keep the display's diffing shadow in step with the panel
+        if self._front._shadow is not None:
+            self.display.set_frame_diff()
+            self.display._shadow[:] = self._front._shadow
+            self.display._shadow_stale = self._front._shadow_stale
+        self._raise_error()
+
+    # ********** PRIVATE METHODS **********
+
+    def _work(self):
+        """
+        The worker thread: send each pending frame as it arrives
+        """
+        front = self._front
+        condition = self._condition
+        while True:
+            with condition:
+                condition.wait_for(lambda: self._queued or not self._running)
+                if not self._queued: return
+                if self._pending_full:
+                    front._shadow_stale = True
+                    self._pending_full = False
+                self._hand_over(self._pending, self._pending_lo, self._pending_hi,
+                                front.buffer, front._dirty_lo, front._dirty_hi)
+                self._queued = False
+                self._busy = True
+            try:
+                front._render()
+                self.frames_sent += 1
+            except Exception as err:
+                with condition:
+                    self.error = err
+                    self._running = False
+                    self._queued = False
+            finally:
+                with condition:
+                    self._busy = False
+                    condition.notify_all()
+
+    def _hand_over(self, source, source_lo, source_hi, target, target_lo, target_hi):
+        """
+        Copy the changed areas of one buffer to another, moving the record of
+        which areas changed with them. Call with the lock held
+
+        Args:
+            source    (buffer) The buffer to copy from
+            source_lo (list)   Its lowest changed column per page, reset on return
+            source_hi (list)   Its highest changed column per page, reset on return
+            target    (buffer) The buffer to copy to
+            target_lo (list)   Its lowest changed column per page, widened on return
+            target_hi (list)   Its highest changed column per page, widened on return
+        """
+        width = self.display.width
+        for page in range(len(source_lo)):
+            lo = source_lo[page]
+            hi = source_hi[page]
+            if lo > hi: continue
+            start = page * width + lo
+            target[start:start + hi - lo + 1] = source[start:start + hi - lo + 1]
+            if lo < target_lo[page]: target_lo[page] = lo
+            if hi > target_hi[page]: target_hi[page] = hi
+            source_lo[page] = width
+            source_hi[page] = -1
+
+    def _raise_error(self):
+        """
+        Re-raise, in the app's thread, an error that stopped the worker
+        """
+        if self.error is not None: raise self.error
+
+
+class ThreadedDisplayGroup(DisplayGroup):
+    """
+    A DisplayGroup that drives each bus after the first from its own
+    long-lived worker thread, so that the buses send in parallel. For CPython
+    hosts: it lives in this module, not ssd1306.py, so that boards needn't
+    compile it. The workers start with the first frame sent; call close()
+    to stop them when the group is done with. Later draws send each bus in
+    turn from the calling thread.
+
+    Version:   2.1.0
+    Author:    smittytone
+    Copyright: 2022, Tony Smith
+    Licence:   MIT
+    """
+
+    # *********** CONSTRUCTOR **********
+
+    def __init__(self, panels, max_transfer=None):
+        self._workers = None
+        self._closed = False
+        DisplayGroup.__init__(self, panels, max_transfer)
+
+    # *********** PUBLIC METHODS **********
+
+    def close(self):
+        """
+        Stop the worker threads. Later draws send each bus in turn from the calling thread
+
+        Returns:
+            The instance (self)
+        """
+        self._closed = True
+        if self._workers is None: return self
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._workers: thread.join()
+        self._workers = None
+        return self
+
+    # ********** PRIVATE METHODS **********
+
+    def _send(self, full, init=False):
+        """
+        Send the changed areas of every panel, the first bus from this
+        thread and the others from their workers
+
+        Args:
+            full (bool) Send each panel's whole buffer
+            init (bool) Set up and clear the panels instead. Default: False
+        """
+        if self._workers is None:
+            if self._closed or len(self._buses) < 2:
+                DisplayGroup._send(self, full, init)
+                return
+            self._start_workers()
+        condition = self._condition
+        with condition:
+            for bus in range(1, len(self._buses)): self._tasks[bus] = (full, init)
+            condition.notify_all()
+        try:
+            for _ in self._bus_steps(0, full, init): pass
+        finally:
+            # Wait for the other buses, even if this one failed
+            with condition:
+                condition.wait_for(lambda: not any(self._tasks))
+                errors = self._errors
+                self._errors = []
+        if errors: raise errors[0]
+
+    def _start_workers(self):
+        """
+        Start a worker thread for each bus after the first
+        """
+        self._condition = threading.Condition()
+        self._running = True
+        # Per bus, the (full, init) arguments of the send it is to make, or None when idle
+        self._tasks = [None] * len(self._buses)
+        self._errors = []
+        self._workers = []
+        for bus in range(1, len(self._buses)):
+            thread = threading.Thread(target=self._work, args=(bus,), name="ssd1306-bus-%i" % bus)
+            thread.daemon = True
+            thread.start()
+            self._workers.append(thread)
+
+    def _work(self, bus):
+        """
+        A worker thread: send a bus's panels each time a task is set for it
+
+        Args:
+            bus (int) The index of the bus
+        """
+        condition = self._condition
+        while True:
+            with condition:
+                condition.wait_for(lambda: self._tasks[bus] is not None or not self._running)
+                if self._tasks[bus] is None: return
+                full, init = self._tasks[bus]
+            try:
+                for _ in self._bus_steps(bus, full, init): pass
+            except Exception as err:
+                with condition: self._errors.append(err)
+            finally:
+                with condition:
+                    self._tasks[bus] = None
+                    condition.notify_all()
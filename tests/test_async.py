@@ -0,0 +1,95 @@
+"""
+Check draw_async() and FrameScheduler against an emulated panel. Runs on CPython
+
+Usage: python -m unittest discover tests
+"""
+
+"""
+IMPORTS
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ssd1306 import SSD1306OLED, FrameScheduler
+from ssd1306_emulator import EmulatedBus, EmulatedSSD1306
+
+"""
+CLASSES
+"""
+class TestCancelledDraw(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EmulatedBus()
+        self.panel = self.bus.add(EmulatedSSD1306(128, 64), 0x3C)
+        # Small transfers, so a full frame takes many steps
+        self.display = SSD1306OLED(self.panel.reset_pin, self.bus, 0x3C, 128, 64, 33)
+
+    def assertPanelMatches(self):
+        buffer = self.display.buffer
+        for y in range(64):
+            for x in range(128):
+                self.assertEqual(self.panel.pixel(x, y), (buffer[(y >> 3) * 128 + x] >> (y & 7)) & 1, "pixel %i, %i" % (x, y))
+
+    def cancel_part_way(self):
+        self.display.rect(0, 0, 128, 64, 1, True).circle(64, 32, 20, 0, True)
+
+        async def main():
+            task = asyncio.ensure_future(self.display.draw_async())
+            for _ in range(3): await asyncio.sleep(0)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        self.bus.reset_stats()
+        asyncio.run(main())
+        # Some of the frame, but not all of it, was sent
+        self.assertGreater(self.bus.stats()["bytes"], 0)
+        self.assertLess(self.bus.stats()["bytes"], len(self.display.buffer))
+        self.display.draw()
+        self.assertPanelMatches()
+
+    def test_next_draw_completes_the_frame(self):
+        self.cancel_part_way()
+
+    def test_next_draw_completes_the_frame_with_frame_diff(self):
+        self.display.set_frame_diff()
+        self.display.draw()
+        self.cancel_part_way()
+
+
+class TestFrameScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.display = SSD1306OLED(None, None, 0x3C, 128, 32)
+        # A clock that moves only when a frame is rendered
+        self.now = 0
+        self.display._clock = lambda micro=False: (lambda: self.now, lambda a, b: a - b)
+        self.rendered = []
+
+    def render(self, display, frame):
+        self.rendered.append(frame)
+        # Frame 0 overruns by one and a half frames; the others take 10ms of their 50ms
+        self.now += 125 if frame == 0 else 10
+
+    def test_overrun_skips_frames(self):
+        scheduler = FrameScheduler(self.display, 20)
+        asyncio.run(scheduler.run(self.render, 6))
+        self.assertEqual(self.rendered, [0, 2, 3, 4, 5])
+        self.assertEqual(scheduler.frames_skipped, 1)
+        self.assertEqual(scheduler.frames_drawn, 5)
+        self.assertFalse(scheduler.running)
+
+    def test_no_overrun_skips_nothing(self):
+        scheduler = FrameScheduler(self.display, 20)
+        asyncio.run(scheduler.run(lambda display, frame: self.rendered.append(frame), 3))
+        self.assertEqual(self.rendered, [0, 1, 2])
+        self.assertEqual(scheduler.frames_skipped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
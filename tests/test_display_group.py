@@ -0,0 +1,163 @@
+"""
+Check DisplayGroup and ThreadedDisplayGroup against emulated panels on two
+emulated buses. Runs on CPython
+
+Usage: python -m unittest discover tests
+"""
+
+"""
+IMPORTS
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ssd1306 import DisplayGroup
+from ssd1306_emulator import EmulatedBus, EmulatedSSD1306
+from ssd1306_threaded import ThreadedDisplayGroup
+
+"""
+CLASSES
+"""
+class CountingPin:
+    """
+    A reset pin, shared by every panel, that records the values it is set to
+    """
+    def __init__(self):
+        self.values = []
+
+    @property
+    def value(self):
+        return self.values[-1] if self.values else True
+
+    @value.setter
+    def value(self, is_on):
+        self.values.append(is_on)
+
+
+class LoggingBus(EmulatedBus):
+    """
+    An emulated bus that takes real time over each transaction, logs the
+    address of each data write, and can be made to fail data writes
+    """
+    def __init__(self, seconds_per_byte=0.000005):
+        super().__init__()
+        self.seconds_per_byte = seconds_per_byte
+        self.log = []
+        self.fail = False
+
+    def writeto(self, address, buffer):
+        data = bytes(buffer)
+        time.sleep(len(data) * self.seconds_per_byte)
+        if self.fail and data[0] == 0x40: raise OSError(5)
+        if data[0] == 0x40: self.log.append(address)
+        super().writeto(address, data)
+
+
+class GroupTests:
+    """
+    The tests, run for each kind of group. Two panels side by side on bus A,
+    a third below the first on bus B
+    """
+    group_class = None
+
+    def setUp(self):
+        self.pin = CountingPin()
+        self.bus_a = LoggingBus()
+        self.bus_b = LoggingBus()
+        self.panels = [self.bus_a.add(EmulatedSSD1306(128, 32), 0x3C),
+                       self.bus_a.add(EmulatedSSD1306(128, 32), 0x3D),
+                       self.bus_b.add(EmulatedSSD1306(128, 32), 0x3C)]
+        self.group = self.group_class([(self.pin, self.bus_a, 0x3C, 128, 32, 0, 0),
+                                       (self.pin, self.bus_a, 0x3D, 128, 32, 128, 0),
+                                       (self.pin, self.bus_b, 0x3C, 128, 32, 0, 32)])
+
+    def tearDown(self):
+        self.bus_b.fail = False
+        self.group.close()
+
+    def draw_scene(self):
+        canvas = self.group.canvas
+        canvas.rect(4, 4, 240, 50, 1)
+        canvas.line(0, 0, 255, 63, 1)
+        canvas.circle(128, 32, 20, 1, True)
+
+    def assertTilesMatch(self):
+        # A 128 x 32 panel's first four pages of GDDRAM are its frame
+        canvas = self.group.canvas
+        for panel, (display, x, y) in zip(self.panels, self.group.tiles):
+            self.assertEqual(bytes(panel.ram[:512]), bytes(display.buffer))
+            for row in range(32):
+                for col in range(128):
+                    self.assertEqual(panel.pixel(col, row),
+                                     (canvas.buffer[((y + row) >> 3) * canvas.width + x + col] >> ((y + row) & 7)) & 1,
+                                     "pixel %i, %i" % (x + col, y + row))
+
+    def test_reset_pin_toggles_once(self):
+        self.assertEqual(self.pin.values, [True, False, True])
+        self.group.draw()
+        self.assertEqual(self.pin.values, [True, False, True])
+
+    def test_panels_are_initialised_and_cleared(self):
+        for panel in self.panels:
+            self.assertTrue(panel.is_on)
+            self.assertEqual(bytes(panel.ram[:512]), bytes(512))
+
+    def test_draw_matches_tiles(self):
+        self.draw_scene()
+        self.group.draw()
+        self.assertTilesMatch()
+        self.group.canvas.clear_region(100, 10, 60, 40)
+        self.group.draw()
+        self.assertTilesMatch()
+
+    def test_draw_async_matches_tiles(self):
+        self.draw_scene()
+        asyncio.run(self.group.draw_async())
+        self.assertTilesMatch()
+        self.assertEqual(self.group.frames, 1)
+
+    def test_shared_bus_panels_interleave(self):
+        self.bus_a.log = []
+        self.group.draw(True)
+        # A page to each panel in turn, not one panel's frame then the other's
+        self.assertEqual(self.bus_a.log[:4], [0x3C, 0x3D, 0x3C, 0x3D])
+        self.assertEqual(self.bus_a.log.count(0x3C), self.bus_a.log.count(0x3D))
+        self.assertEqual(set(self.bus_b.log), {0x3C})
+
+    def test_bus_error_is_raised(self):
+        self.draw_scene()
+        self.bus_b.fail = True
+        self.assertRaises(OSError, self.group.draw)
+        # The other bus still sent its panels
+        for panel, (display, x, y) in zip(self.panels[:2], self.group.tiles[:2]):
+            self.assertEqual(bytes(panel.ram[:512]), bytes(display.buffer))
+        self.bus_b.fail = False
+        self.group.draw()
+        self.assertTilesMatch()
+
+
+class TestDisplayGroup(GroupTests, unittest.TestCase):
+    group_class = DisplayGroup
+
+
+class TestThreadedDisplayGroup(GroupTests, unittest.TestCase):
+    group_class = ThreadedDisplayGroup
+
+    def test_workers_start_and_stop(self):
+        self.assertEqual(len(self.group._workers), 1)
+        self.assertTrue(self.group._workers[0].is_alive())
+        worker = self.group._workers[0]
+        self.group.close()
+        self.assertFalse(worker.is_alive())
+        # Later draws send each bus in turn
+        self.draw_scene()
+        self.group.draw()
+        self.assertTilesMatch()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Check what the driver sends over an emulated bus, and that the emulated
+panel ends up showing the buffer. Runs on CPython
+
+Usage: python -m unittest discover tests
+"""
+
+"""
+IMPORTS
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ssd1306 import SSD1306OLED
+from ssd1306_emulator import EmulatedBus, EmulatedSSD1306
+
+"""
+CLASSES
+"""
+class LoggingBus(EmulatedBus):
+    """
+    An emulated bus that logs each transaction, and can be made to fail
+    a chosen data write
+    """
+    def __init__(self):
+        super().__init__()
+        self.log = []
+        self.fail_at = None
+
+    def writeto(self, address, buffer):
+        data = bytes(buffer)
+        if data[0] == 0x40 and self.fail_at is not None:
+            self.fail_at -= 1
+            if self.fail_at < 0:
+                self.fail_at = None
+                raise OSError(5)
+        self.log.append(data)
+        super().writeto(address, data)
+
+    def data_writes(self):
+        return [write for write in self.log if write[0] == 0x40]
+
+
+class EmulatedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = LoggingBus()
+        self.panel = self.bus.add(EmulatedSSD1306(128, 64), 0x3C)
+        self.display = SSD1306OLED(self.panel.reset_pin, self.bus, 0x3C, 128, 64)
+
+    def draw_scene(self):
+        self.display.rect(10, 5, 60, 40, 1, True).circle(90, 32, 20, 1).text("Hello")
+
+    def start_log(self):
+        self.bus.log = []
+        self.bus.reset_stats()
+
+    def assertPanelMatches(self):
+        buffer = self.display.buffer
+        for y in range(64):
+            for x in range(128):
+                self.assertEqual(self.panel.pixel(x, y), (buffer[(y >> 3) * 128 + x] >> (y & 7)) & 1, "pixel %i, %i" % (x, y))
+
+
+class TestFrameDiff(EmulatedTests):
+
+    def test_identical_frame_sends_nothing(self):
+        self.display.set_frame_diff()
+        self.draw_scene()
+        self.display.draw()
+        self.display.clear()
+        self.draw_scene()
+        self.start_log()
+        self.display.draw()
+        self.assertEqual(self.bus.stats()["bytes"], 0)
+        self.assertPanelMatches()
+
+    def test_changed_bytes_only_are_sent(self):
+        self.display.set_frame_diff()
+        self.draw_scene()
+        self.display.draw()
+        self.display.clear()
+        self.draw_scene()
+        self.display.plot(127, 63)
+        self.start_log()
+        self.display.draw()
+        self.assertEqual(self.bus.data_writes(), [bytes([0x40, 0x80])])
+        self.assertPanelMatches()
+
+
+class TestFailedWrites(EmulatedTests):
+
+    def setUp(self):
+        super().setUp()
+        # Send in small chunks, so a write can fail part way through a window
+        self.display = SSD1306OLED(self.panel.reset_pin, self.bus, 0x3C, 128, 64, 33)
+
+    def check_recovery(self):
+        self.display.draw()
+        self.draw_scene()
+        self.bus.fail_at = 3
+        self.assertRaises(OSError, self.display.draw)
+        self.display.draw()
+        self.assertPanelMatches()
+
+    def test_failed_write_is_resent(self):
+        self.check_recovery()
+
+    def test_failed_write_is_resent_with_frame_diff(self):
+        self.display.set_frame_diff()
+        self.check_recovery()
+
+
+class TestScrolling(EmulatedTests):
+
+    def test_ending_a_scroll_sends_the_whole_frame(self):
+        self.display.set_frame_diff()
+        self.draw_scene()
+        self.display.draw()
+        self.display.scroll_horizontal("left")
+        self.panel.step(10)
+        self.display.plot(0, 63)
+        self.start_log()
+        self.display.draw()
+        self.assertFalse(self.panel.is_scrolling)
+        self.assertEqual(sum([len(write) - 1 for write in self.bus.data_writes()]), len(self.display.buffer))
+        self.assertPanelMatches()
+
+
+    def test_stop_scroll_restores_the_panel(self):
+        self.draw_scene()
+        self.display.draw()
+        self.display.scroll_diagonal("right", 2)
+        self.panel.step(20)
+        self.display.stop_scroll()
+        self.assertFalse(self.panel.is_scrolling)
+        self.assertEqual(self.panel.writes_while_scrolling, 0)
+        self.assertPanelMatches()
+
+
+class TestCrossover(EmulatedTests):
+
+    def test_scattered_changes_send_one_full_frame(self):
+        self.display.draw()
+        # Short of the full width, the window takes a transaction per page,
+        # which costs more than sending the whole frame in one
+        for page in range(8):
+            self.display.plot(1, page * 8).plot(127, page * 8)
+        self.start_log()
+        self.display.draw()
+        self.assertEqual([len(write) for write in self.bus.data_writes()], [len(self.display.buffer) + 1])
+        self.assertPanelMatches()
+
+    def test_small_change_sends_a_window(self):
+        self.display.draw()
+        self.display.plot(5, 5)
+        self.start_log()
+        self.display.draw()
+        self.assertEqual(self.bus.data_writes(), [bytes([0x40, 0x20])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+"""
+Check the exact bytes the driver puts on the I2C bus. Runs on CPython
+with a mock bus and reset pin
+
+Usage: python -m unittest discover tests
+"""
+
+"""
+IMPORTS
+"""
+import os
+import sys
+import tracemalloc
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ssd1306 import SSD1306OLED, Font
+
+"""
+CLASSES
+"""
+class MockPin:
+    """
+    A stand-in for a CircuitPython DigitalInOut reset pin
+    """
+    def __init__(self):
+        self.value = True
+
+
+class MockI2C:
+    """
+    A stand-in I2C bus that records every transaction
+    """
+    def __init__(self):
+        self.writes = []
+
+    def writeto(self, address, buffer):
+        self.writes.append((address, bytes(buffer)))
+
+
+class TestTransmittedBytes(unittest.TestCase):
+
+    def setUp(self):
+        self.i2c = MockI2C()
+        self.display = SSD1306OLED(MockPin(), self.i2c, 0x3C, 128, 32)
+        self.i2c.writes = []
+
+    def window(self, col_start, col_end, page_start, page_end):
+        # COLUMNADDR and PAGEADDR, behind a command control byte
+        return (0x3C, bytes([0x00, 0x21, col_start, col_end, 0x22, page_start, page_end]))
+
+    def data(self, *values):
+        return (0x3C, bytes([0x40]) + bytes(values))
+
+    def test_plot_sends_one_column(self):
+        self.display.plot(10, 5).draw()
+        self.assertEqual(self.i2c.writes, [self.window(10, 10, 0, 0), self.data(0x20)])
+
+    def test_text_sends_glyph_columns(self):
+        self.display.move(0, 8).text("A").draw()
+        self.assertEqual(self.i2c.writes, [self.window(0, 4, 1, 1), self.data(0x7E, 0x09, 0x09, 0x09, 0x7E)])
+
+    def test_clear_sends_whole_buffer(self):
+        self.display.plot(10, 5).draw()
+        self.i2c.writes = []
+        self.display.clear().draw()
+        self.assertEqual(self.i2c.writes, [self.window(0, 127, 0, 3), self.data(*([0] * 512))])
+
+    def test_clean_draw_sends_nothing(self):
+        self.display.plot(10, 5).draw()
+        self.i2c.writes = []
+        self.display.draw()
+        self.assertEqual(self.i2c.writes, [])
+
+    def test_full_draw_is_chunked(self):
+        self.display.set_max_transfer(129)
+        self.display.plot(0, 0).draw(True)
+        self.assertEqual(self.i2c.writes[0], self.window(0, 127, 0, 3))
+        self.assertEqual(self.i2c.writes[1], self.data(*([1] + [0] * 127)))
+        self.assertEqual(self.i2c.writes[2:], [self.data(*([0] * 128))] * 3)
+
+    def test_window_spans_dirty_pages(self):
+        self.display.plot(3, 0).plot(6, 9).draw()
+        self.assertEqual(self.i2c.writes, [self.window(3, 6, 0, 1),
+                                           self.data(0x01, 0x00, 0x00, 0x00),
+                                           self.data(0x00, 0x00, 0x00, 0x02)])
+
+
+class TestScrollCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.i2c = MockI2C()
+        self.display = SSD1306OLED(MockPin(), self.i2c, 0x3C, 128, 32)
+        self.i2c.writes = []
+
+    def commands(self, *values):
+        return (0x3C, bytes([0x00]) + bytes(values))
+
+    def test_scroll_left(self):
+        self.display.scroll_horizontal("left", 1, 2, 2)
+        # Stop, then LEFT_HORIZONTAL_SCROLL: dummy, start page, interval code, end page, dummies; then start
+        self.assertEqual(self.i2c.writes, [self.commands(0x2E, 0x27, 0x00, 0x01, 0x07, 0x02, 0x00, 0xFF, 0x2F)])
+
+    def test_scroll_right(self):
+        self.display.scroll_horizontal("right")
+        self.assertEqual(self.i2c.writes, [self.commands(0x2E, 0x26, 0x00, 0x00, 0x00, 0x03, 0x00, 0xFF, 0x2F)])
+
+    def test_scroll_diagonal_left(self):
+        self.display.set_scroll_area(8, 24).scroll_diagonal("left", 3, 0, 1, 25)
+        # Stop, SET_VERTICAL_SCROLL_AREA: fixed rows, scrolled rows; then the scroll: dummy, pages, interval code, rows per step
+        self.assertEqual(self.i2c.writes, [self.commands(0x2E, 0xA3, 0x08, 0x18, 0x2A, 0x00, 0x00, 0x06, 0x01, 0x03, 0x2F)])
+
+    def test_scroll_diagonal_right(self):
+        self.display.scroll_diagonal("right")
+        self.assertEqual(self.i2c.writes, [self.commands(0x2E, 0xA3, 0x00, 0x20, 0x29, 0x00, 0x00, 0x00, 0x03, 0x01, 0x2F)])
+
+    def test_stop_scroll_resets_start_line_and_sends_frame(self):
+        self.display.scroll_horizontal()
+        self.i2c.writes = []
+        self.display.stop_scroll()
+        self.assertEqual(self.i2c.writes, [self.commands(0x2E, 0x40),
+                                           self.commands(0x21, 0, 127, 0x22, 0, 3),
+                                           (0x3C, bytes([0x40]) + bytes(512))])
+
+    def test_draw_stops_scroll_first(self):
+        self.display.scroll_horizontal()
+        self.i2c.writes = []
+        self.display.plot(0, 0).draw()
+        self.assertEqual(self.i2c.writes[0], self.commands(0x2E, 0x40))
+        self.assertFalse(self.display.is_scrolling)
+
+
+class NullI2C:
+    """
+    A stand-in I2C bus that discards every transaction
+    """
+    def writeto(self, address, buffer):
+        pass
+
+
+class TestAllocation(unittest.TestCase):
+
+    def measure(self, full):
+        # Return the growth in heap use, and its peak, across 1000 draws
+        display = SSD1306OLED(MockPin(), NullI2C(), 0x3C, 128, 64)
+        columns = list(range(128))
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for i in range(1000):
+                display.plot(columns[i & 127], 5, i & 1).draw(full)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return current - before, peak - before
+
+    def test_full_draws_do_not_copy_the_frame(self):
+        # A frame is 1024 bytes: the old draw() made two copies every time
+        growth, peak = self.measure(True)
+        self.assertLess(growth, 128)
+        self.assertLess(peak, 512)
+
+    def test_partial_draws_do_not_accumulate(self):
+        # Each partial write allocates one memoryview slice, freed at once
+        growth, peak = self.measure(False)
+        self.assertLess(growth, 128)
+        self.assertLess(peak, 512)
+
+
+class TestDoubleSizeText(unittest.TestCase):
+
+    def heap_growth(self, glyphs):
+        # Return the heap a first text_2x() character costs with a font of this many glyphs
+        display = SSD1306OLED(MockPin(), NullI2C(), 0x3C, 128, 32)
+        font = Font.from_charset([b"\x7e\x09\x09\x7e"] * glyphs)
+        # Warm up with the built-in font, so lazy imports aren't counted
+        display.text_2x("A")
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            display.text_2x("A", font=font)
+            growth = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        return growth
+
+    def test_one_character_does_not_scale_with_the_font(self):
+        # Converting the whole font would cost 24 bytes per glyph: 72000 here
+        self.assertLess(self.heap_growth(3000) - self.heap_growth(30), 4096)
+
+    def test_preload_matches_lazy_conversion(self):
+        lazy = SSD1306OLED(MockPin(), NullI2C(), 0x3C, 128, 32)
+        lazy._default_font().preload_2x("Hi")
+        lazy.text_2x("Hi!")
+        preloaded = SSD1306OLED(MockPin(), NullI2C(), 0x3C, 128, 32)
+        preloaded._default_font().preload_2x()
+        preloaded.text_2x("Hi!")
+        self.assertEqual(bytes(lazy.buffer), bytes(preloaded.buffer))
+
+
+class TestMeasurement(unittest.TestCase):
+
+    def setUp(self):
+        self.display = SSD1306OLED(MockPin(), NullI2C(), 0x3C, 128, 32)
+        self.font = self.display._default_font()
+        self.runs = 0
+        run_width = self.font._run_width
+        def counted(text):
+            self.runs += 1
+            return run_width(text)
+        self.font._run_width = counted
+
+    def test_repeated_measurement_is_cached(self):
+        width = self.display.length_of_string("Temperature")
+        self.assertEqual(self.runs, 1)
+        self.assertEqual(self.display.length_of_string("Temperature"), width)
+        self.assertEqual(self.runs, 1)
+
+    def test_measurement_does_not_evict_layouts(self):
+        self.font.layout("Label", 64)
+        for i in range(Font.MEASURE_CACHE_SIZE * 2): self.display.length_of_string(str(i))
+        self.runs = 0
+        self.font.layout("Label", 64)
+        self.assertEqual(self.runs, 0)
+
+    def test_least_recently_used_measurement_is_evicted(self):
+        for i in range(Font.MEASURE_CACHE_SIZE): self.display.length_of_string(str(i))
+        self.display.length_of_string("0")
+        self.display.length_of_string("new")
+        self.runs = 0
+        self.display.length_of_string("0")
+        self.assertEqual(self.runs, 0)
+        self.display.length_of_string("1")
+        self.assertEqual(self.runs, 1)
+
+
+class TestEllipse(unittest.TestCase):
+
+    def test_large_filled_circles_match_the_ellipse_rule(self):
+        # Radii large enough that the rule's own products overflow MicroPython's small ints
+        for radius in (91, 120, 200):
+            display = SSD1306OLED(MockPin(), NullI2C(), 0x3C, 128, 64)
+            display.circle(64, 32, radius, 1, True)
+            side = (2 * radius + 1) ** 2
+            for y in range(64):
+                for x in range(128):
+                    inside = 4 * (x - 64) ** 2 * side + 4 * (y - 32) ** 2 * side <= side * side
+                    self.assertEqual((display.buffer[(y >> 3) * 128 + x] >> (y & 7)) & 1, int(inside), "radius %i, pixel %i, %i" % (radius, x, y))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Check ThreadedRenderer against an emulated panel on a bus that sleeps to
+simulate transfer time. Runs on CPython
+
+Usage: python -m unittest discover tests
+"""
+
+"""
+IMPORTS
+"""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ssd1306 import SSD1306OLED
+from ssd1306_emulator import EmulatedBus, EmulatedSSD1306
+from ssd1306_threaded import ThreadedRenderer
+
+"""
+CLASSES
+"""
+class SleepingBus(EmulatedBus):
+    """
+    An emulated bus that takes real time over each transaction, logs it,
+    and can be made to fail data writes
+    """
+    def __init__(self, seconds_per_byte=0.00002):
+        super().__init__()
+        self.seconds_per_byte = seconds_per_byte
+        self.log = []
+        self.fail = False
+
+    def writeto(self, address, buffer):
+        data = bytes(buffer)
+        time.sleep(len(data) * self.seconds_per_byte)
+        if self.fail and data[0] == 0x40: raise OSError(5)
+        self.log.append(data)
+        super().writeto(address, data)
+
+
+class TestThreadedRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = SleepingBus()
+        self.panel = self.bus.add(EmulatedSSD1306(128, 64), 0x3C)
+        self.display = SSD1306OLED(self.panel.reset_pin, self.bus, 0x3C, 128, 64)
+        self.renderer = None
+
+    def tearDown(self):
+        if self.renderer is not None and self.renderer._running:
+            self.bus.fail = False
+            try:
+                self.renderer.close()
+            except OSError:
+                pass
+
+    def start(self, diff=False):
+        if diff: self.display.set_frame_diff()
+        self.renderer = ThreadedRenderer(self.display)
+        return self.renderer
+
+    def assertPanelMatches(self):
+        buffer = self.display.buffer
+        for y in range(64):
+            for x in range(128):
+                self.assertEqual(self.panel.pixel(x, y), (buffer[(y >> 3) * 128 + x] >> (y & 7)) & 1, "pixel %i, %i" % (x, y))
+
+    def test_frames_coalesce(self):
+        renderer = self.start()
+        for i in range(50):
+            self.display.rect(i, i % 60, 20, 4, i & 1, True)
+            renderer.draw()
+        self.assertTrue(renderer.flush(5))
+        self.assertGreater(renderer.frames_coalesced, 0)
+        self.assertEqual(renderer.frames_sent + renderer.frames_coalesced, renderer.frames_submitted)
+        self.assertPanelMatches()
+
+    def test_wait_and_flush(self):
+        renderer = self.start()
+        self.bus.seconds_per_byte = 0.0005
+        renderer.draw(True)
+        # A full frame now takes about half a second on the bus
+        self.assertFalse(renderer.wait(0.01))
+        self.assertTrue(renderer.wait(5))
+        self.assertEqual(renderer.frames_sent, 1)
+        self.bus.seconds_per_byte = 0.00002
+        self.display.plot(5, 5)
+        self.assertTrue(renderer.flush(5))
+        self.assertEqual(renderer.frames_sent, 2)
+        self.assertPanelMatches()
+
+    def test_commands_follow_queued_frames(self):
+        renderer = self.start()
+        self.bus.seconds_per_byte = 0.0001
+        renderer.draw(True)
+        self.display.set_inverse()
+        inverse = self.bus.log.index(bytes([0x00, 0xA7]))
+        data = [i for i, write in enumerate(self.bus.log) if write[0] == 0x40]
+        self.assertTrue(len(data) > 0 and max(data) < inverse)
+        self.assertTrue(self.panel.is_inverse)
+
+    def test_worker_error_raised_by_next_draw(self):
+        renderer = self.start()
+        self.bus.fail = True
+        renderer.draw(True)
+        for _ in range(500):
+            if renderer.error is not None: break
+            time.sleep(0.01)
+        self.assertRaises(OSError, renderer.draw)
+
+    def test_close_hands_back_bus_and_shadow(self):
+        renderer = self.start(True)
+        self.display.rect(10, 10, 50, 30, 1, True)
+        renderer.draw()
+        renderer.close()
+        self.assertIs(self.display.i2c, self.bus)
+        self.assertPanelMatches()
+        # The display's shadow matches the panel, so an unchanged frame sends nothing
+        self.bus.reset_stats()
+        self.display.rect(10, 10, 50, 30, 1, True).draw()
+        self.assertEqual(self.bus.stats()["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
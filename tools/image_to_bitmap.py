@@ -0,0 +1,279 @@
+"""
+Converts PBM, PGM and PNG images to the SSD1306 page layout used by the display
+buffer and by Bitmap: rows are grouped into 8-pixel pages, each page is one byte
+per column, and bit 0 of each byte is the page's top pixel.
+
+Runs on a computer with CPython 3, not on the device. Bright pixels are lit; use
+--invert for black-on-white artwork. Greyscale images are thresholded, or
+dithered with --dither.
+
+Usage:
+    python tools/image_to_bitmap.py eye.pbm mouth.png -o sprites.py
+    python tools/image_to_bitmap.py frame_*.pgm --format bin -o frames/
+
+Load the output on the device with:
+    Bitmap(EYE_WIDTH, EYE_HEIGHT, EYE)              # Python output
+    Bitmap(32, 32, open("eye.bin", "rb").read())    # Binary output
+"""
+
+"""
+IMPORTS
+"""
+import argparse
+import os
+import sys
+import zlib
+
+"""
+FUNCTIONS
+"""
+def read_image(path):
+    """
+    Load an image as a list of rows of 0-255 luminance values
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return read_png(data)
+    if data[:1] == b"P" and data[1:2] in b"1245":
+        return read_pnm(data)
+    raise ValueError("%s is not a PBM, PGM or PNG image" % path)
+
+
+def read_pnm(data):
+    """
+    Decode a PBM (P1, P4) or PGM (P2, P5) image
+    """
+    kind = data[1:2]
+    position = 2
+    fields = []
+    wanted = 2 if kind in (b"1", b"4") else 3
+
+    # Read the header fields, skipping comments
+    while len(fields) < wanted:
+        while data[position:position + 1].isspace(): position += 1
+        if data[position:position + 1] == b"#":
+            while data[position:position + 1] not in (b"\n", b"\r", b""): position += 1
+            continue
+        start = position
+        while not data[position:position + 1].isspace(): position += 1
+        fields.append(int(data[start:position]))
+    width, height = fields[0], fields[1]
+    maxval = fields[2] if wanted == 3 else 1
+    position += 1
+
+    if kind == b"4":
+        stride = (width + 7) >> 3
+        return [[0 if data[position + y * stride + (x >> 3)] & (0x80 >> (x & 7)) else 255
+                 for x in range(width)] for y in range(height)]
+    if kind == b"5":
+        size = 2 if maxval > 255 else 1
+        values = [int.from_bytes(data[i:i + size], "big")
+                  for i in range(position, position + width * height * size, size)]
+    else:
+        # ASCII formats. P1 values may be run together without spaces
+        text = b"\n".join(line.split(b"#")[0] for line in data[position:].splitlines())
+        if kind == b"1":
+            values = [int(c) for c in text.decode("ascii") if c in "01"]
+        else:
+            values = [int(v) for v in text.split()]
+    values = values[:width * height]
+    if kind == b"1":
+        return [[0 if values[y * width + x] else 255 for x in range(width)] for y in range(height)]
+    return [[values[y * width + x] * 255 // maxval for x in range(width)] for y in range(height)]
+
+
+def read_png(data):
+    """
+    Decode a non-interlaced PNG image of any colour type and bit depth.
+    Transparent pixels are composited over black
+    """
+    position = 8
+    idat = bytearray()
+    palette = None
+    transparency = None
+    while position < len(data):
+        length = int.from_bytes(data[position:position + 4], "big")
+        kind = data[position + 4:position + 8]
+        chunk = data[position + 8:position + 8 + length]
+        position += length + 12
+        if kind == b"IHDR":
+            width = int.from_bytes(chunk[0:4], "big")
+            height = int.from_bytes(chunk[4:8], "big")
+            depth, colour, interlace = chunk[8], chunk[9], chunk[12]
+        elif kind == b"PLTE":
+            palette = [tuple(chunk[i:i + 3]) for i in range(0, len(chunk), 3)]
+        elif kind == b"tRNS":
+            transparency = chunk
+        elif kind == b"IDAT":
+            idat.extend(chunk)
+        elif kind == b"IEND":
+            break
+    if interlace:
+        raise ValueError("Interlaced PNG images are not supported")
+
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[colour]
+    bits = channels * depth
+    stride = (width * bits + 7) >> 3
+    step = max(bits >> 3, 1)
+    raw = zlib.decompress(bytes(idat))
+    rows = []
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        method = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        for i in range(stride):
+            left = row[i - step] if i >= step else 0
+            up = previous[i]
+            corner = previous[i - step] if i >= step else 0
+            if method == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif method == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif method == 3:
+                row[i] = (row[i] + ((left + up) >> 1)) & 0xFF
+            elif method == 4:
+                estimate = left + up - corner
+                pa, pb, pc = abs(estimate - left), abs(estimate - up), abs(estimate - corner)
+                predictor = left if pa <= pb and pa <= pc else (up if pb <= pc else corner)
+                row[i] = (row[i] + predictor) & 0xFF
+        previous = row
+        rows.append([luminance(sample_pixel(row, x, depth, channels), colour, depth, palette, transparency)
+                     for x in range(width)])
+    return rows
+
+
+def sample_pixel(row, x, depth, channels):
+    """
+    Extract one pixel's samples from an unfiltered PNG row
+    """
+    if depth < 8:
+        bit = x * depth
+        return ((row[bit >> 3] >> (8 - depth - (bit & 7))) & ((1 << depth) - 1),)
+    size = depth >> 3
+    start = x * channels * size
+    return tuple(int.from_bytes(row[start + i * size:start + (i + 1) * size], "big") for i in range(channels))
+
+
+def luminance(samples, colour, depth, palette, transparency):
+    """
+    Convert a PNG pixel's samples to a 0-255 luminance value
+    """
+    maximum = (1 << depth) - 1
+    alpha = 255
+    if colour == 3:
+        red, green, blue = palette[samples[0]]
+        if transparency is not None and samples[0] < len(transparency): alpha = transparency[samples[0]]
+        return (red * 299 + green * 587 + blue * 114) // 1000 * alpha // 255
+    if colour in (0, 4):
+        value = samples[0] * 255 // maximum
+    else:
+        value = (samples[0] * 299 + samples[1] * 587 + samples[2] * 114) // 1000 * 255 // maximum
+    if colour in (4, 6): alpha = samples[-1] * 255 // maximum
+    return value * alpha // 255
+
+
+def to_pixels(image, threshold=128, dither=False, invert=False):
+    """
+    Reduce a luminance image to lit (1) and unlit (0) pixels, optionally
+    with Floyd-Steinberg dithering
+    """
+    height = len(image)
+    width = len(image[0]) if height else 0
+    levels = [[255 - v if invert else v for v in row] for row in image]
+    pixels = [[0] * width for _ in range(height)]
+    for y in range(height):
+        for x in range(width):
+            value = levels[y][x]
+            lit = 1 if value >= threshold else 0
+            pixels[y][x] = lit
+            if dither:
+                error = value - (255 if lit else 0)
+                if x + 1 < width: levels[y][x + 1] += error * 7 // 16
+                if y + 1 < height:
+                    if x > 0: levels[y + 1][x - 1] += error * 3 // 16
+                    levels[y + 1][x] += error * 5 // 16
+                    if x + 1 < width: levels[y + 1][x + 1] += error // 16
+    return pixels
+
+
+def to_pages(pixels):
+    """
+    Pack lit/unlit pixels into the SSD1306 page layout
+    """
+    height = len(pixels)
+    width = len(pixels[0]) if height else 0
+    data = bytearray(width * ((height + 7) >> 3))
+    for y in range(height):
+        base = (y >> 3) * width
+        bit = 1 << (y & 7)
+        for x in range(width):
+            if pixels[y][x]: data[base + x] |= bit
+    return bytes(data)
+
+
+def python_name(path):
+    """
+    Make a constant name from an image's file name
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = "".join(c if c.isalnum() else "_" for c in stem).upper()
+    return "_" + name if name[:1].isdigit() else name
+
+
+def python_source(assets):
+    """
+    Generate a Python module defining each image's size and data
+    """
+    lines = ['"""', "Generated by tools/image_to_bitmap.py", '"""']
+    for name, width, height, data in assets:
+        lines.append("")
+        lines.append("%s_WIDTH = %i" % (name, width))
+        lines.append("%s_HEIGHT = %i" % (name, height))
+        lines.append("%s = (" % name)
+        for i in range(0, len(data), 16):
+            lines.append('    b"%s"' % "".join("\\x%02x" % b for b in data[i:i + 16]))
+        lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PBM, PGM and PNG images to SSD1306 page-layout bitmaps")
+    parser.add_argument("images", nargs="+", help="the images to convert")
+    parser.add_argument("-o", "--output", help="the Python file, or the directory for .bin files, to write. Default: stdout, or beside each image")
+    parser.add_argument("-f", "--format", choices=("py", "bin"), default="py", help="write a Python module or raw binary files. Default: py")
+    parser.add_argument("-t", "--threshold", type=int, default=128, help="the luminance, 0-255, at which pixels are lit. Default: 128")
+    parser.add_argument("-d", "--dither", action="store_true", help="dither greyscale images")
+    parser.add_argument("-i", "--invert", action="store_true", help="light the dark pixels")
+    args = parser.parse_args(argv)
+
+    assets = []
+    for path in args.images:
+        image = read_image(path)
+        pixels = to_pixels(image, args.threshold, args.dither, args.invert)
+        width = len(pixels[0]) if pixels else 0
+        assets.append((python_name(path), width, len(pixels), to_pages(pixels)))
+
+        if args.format == "bin":
+            name = os.path.splitext(os.path.basename(path))[0] + ".bin"
+            folder = args.output if args.output else os.path.dirname(path)
+            if folder: os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, name), "wb") as file:
+                file.write(assets[-1][3])
+            print("%s: %i x %i, %i bytes" % (os.path.join(folder, name), width, len(pixels), len(assets[-1][3])))
+
+    if args.format == "py":
+        source = python_source(assets)
+        if args.output:
+            with open(args.output, "w") as file:
+                file.write(source)
+        else:
+            sys.stdout.write(source)
+
+
+"""
+RUNTIME START
+"""
+if __name__ == '__main__':
+    main()